@@ -1,25 +1,239 @@
 import argparse
+import json
+import os
+import sys
 from pathlib import Path
-from playwright.sync_api import sync_playwright
 
 HPE_HOME = "https://support.hpe.com/connect/s/"
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--out", default="hpe_state.json", help="Output storage state json (cookies/session)")
-    ap.add_argument("--url", default=HPE_HOME, help="Start URL (default: HPE Support Center home)")
-    args = ap.parse_args()
+# Standard automation flags: keep Chromium from spending CPU/RAM on update
+# checks, translate, sync, crash reporting etc. while it idles during login.
+CHROMIUM_ARGS = [
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions",
+    "--disable-sync",
+    "--no-default-browser-check",
+    "--no-first-run",
+    "--disable-breakpad",
+    "--disable-crash-reporter",
+]
+
+
+def block_heavy_assets(context) -> None:
+    """Abort image/font/media requests: the login flow works without them and the
+    HPE home page ships tens of MB of hero images/webfonts we don't need."""
+    def _block(route):
+        if route.request.resource_type in ("image", "font", "media"):
+            return route.abort()
+        return route.continue_()
+    context.route("**/*", _block)
+
+
+def stub_analytics(context) -> None:
+    """Neuter in-page analytics calls before first paint.
+
+    Complements block_heavy_assets(): beacons/fetches to tracker hosts are
+    answered locally so the renderer never queues or retries them while the
+    user is busy with MFA.
+    """
+    context.add_init_script("""
+      const block = ['omtrdc.net','demdex.net','newrelic.com','nr-data.net','google-analytics.com','googletagmanager.com'];
+      const orig = window.fetch;
+      window.fetch = (u, ...r) => block.some(b => String(u).includes(b)) ? Promise.resolve(new Response('', {status: 204})) : orig(u, ...r);
+      navigator.sendBeacon = () => true;
+    """)
+
+
+def _has_sso_cookies(page) -> bool:
+    """True when the context carries HPE SSO cookies (auth.hpe.com).
+
+    Anonymous browsing of the public portal never touches auth.hpe.com, so
+    their presence distinguishes an already-logged-in profile from a fresh one.
+    """
+    try:
+        return any("auth.hpe.com" in (c.get("domain") or "") for c in page.context.cookies())
+    except Exception:
+        return False
+
+
+def wait_for_login(page, timeout_s: int = 600) -> bool:
+    """Poll until the portal looks logged in, so no ENTER keypress is needed.
+
+    A not-yet-rendered SPA shell shows neither the Sign In UI nor auth.hpe.com
+    in the URL, so "nothing login-ish visible" alone proves nothing. Require a
+    positive signal first: either the login UI appeared and then went away, or
+    the profile already carries SSO cookies. Returns False on timeout/errors so
+    the caller can fall back to the manual ENTER prompt.
+    """
+    import time
+    try:
+        page.wait_for_load_state("domcontentloaded", timeout=30000)
+    except Exception:
+        pass
+    deadline = time.monotonic() + timeout_s
+    seen_login_ui = False
+    while time.monotonic() < deadline:
+        probe_ok = True
+        try:
+            u = (page.url or "").lower()
+            on_auth = "auth.hpe.com" in u or "signin" in u
+            login_ui = page.locator(
+                "a[data-key='SignIn'], a[href*='/home/signin'], input[type='password']"
+            ).count() > 0
+        except Exception:
+            # Transient: the SSO redirect chain tears down execution contexts
+            # mid-probe. Unknown this tick; try again on the next one.
+            probe_ok = False
+        if probe_ok:
+            if on_auth or login_ui:
+                seen_login_ui = True
+            elif seen_login_ui or _has_sso_cookies(page):
+                return True
+        try:
+            page.wait_for_timeout(2000)
+        except Exception:
+            return False  # page/context is gone for real
+    return False
+
+
+def _lock_file(f) -> None:
+    """Exclusive advisory lock (POSIX flock / Windows msvcrt); released on close."""
+    try:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def save_state(context, out_path: Path) -> None:
+    """Write storage state compactly and atomically.
+
+    Playwright's own path= writer pretty-prints the JSON; dumping the dict
+    ourselves with no whitespace shrinks the file substantially, and the
+    tmp-file + os.replace dance means a crash never leaves a partial state.
+
+    IndexedDB is deliberately not captured: HPE auth rides on cookies +
+    localStorage, and the IDB snapshot is the slow/bulky part of the dump.
+    """
+    try:
+        state = context.storage_state(indexed_db=False)
+    except TypeError:
+        # Older Playwright without the kwarg; drop any IDB blobs after the fact.
+        state = context.storage_state()
+        for origin in state.get("origins", []):
+            origin.pop("indexedDB", None)
+
+    # Keep only HPE origins. Login touches plenty of third-party CDN/analytics
+    # domains whose cookies we never need again; dropping them shrinks the file
+    # and avoids persisting tracker tokens.
+    allow = (".hpe.com", "hpe.com", ".hpeapps.com", "hpeapps.com")
+    try:
+        state["cookies"] = [c for c in state.get("cookies", []) if c.get("domain", "").endswith(allow)]
+        state["origins"] = [o for o in state.get("origins", []) if any(d in o.get("origin", "") for d in allow)]
+    except Exception:
+        pass  # never lose a login over filtering
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    payload = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if out_path.suffix == ".gz":
+        # Session JSON (repeated domains, base64 tokens) compresses 3-5x;
+        # handy when the state lives on a network share / CI artifact store.
+        import gzip
+        payload = gzip.compress(payload, compresslevel=6)
+
+    # Sidecar lock so parallel capture jobs sharing one directory don't race
+    # each other's tmp file; the rename itself stays atomic.
+    with open(out_path.with_suffix(out_path.suffix + ".lock"), "wb") as lf:
+        try:
+            _lock_file(lf)
+        except Exception:
+            pass
+        tmp.write_bytes(payload)
+        os.replace(tmp, out_path)
+
+def state_still_valid(out_path: Path, url: str, max_age_s: int = 12 * 3600) -> bool:
+    """Cheap preflight: is the existing state file fresh and still accepted?
+
+    Sends one HEAD request carrying the saved HPE cookies (stdlib only, no
+    browser launch). The url must be an endpoint that 401s/redirects for
+    anonymous callers - the public portal home answers 200 to everyone, so a
+    200 from it proves nothing. Any doubt returns False so we fall through to
+    a real login.
+    """
+    if url.rstrip("/") == HPE_HOME.rstrip("/"):
+        # Public home: a 200 here is inconclusive, never skip the login on it.
+        return False
+    import time
+    import urllib.request
+    try:
+        if (time.time() - out_path.stat().st_mtime) > max_age_s:
+            return False
+        if out_path.suffix == ".gz":
+            import gzip
+            state = json.loads(gzip.decompress(out_path.read_bytes()).decode("utf-8"))
+        else:
+            state = json.loads(out_path.read_text(encoding="utf-8"))
+        cookies = [c for c in state.get("cookies", []) if "hpe.com" in c.get("domain", "")]
+        if not cookies:
+            return False
+        hdr = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+        class _NoRedirect(urllib.request.HTTPRedirectHandler):
+            def redirect_request(self, *a, **k):
+                return None
 
-    out_path = Path(args.out).resolve()
+        req = urllib.request.Request(url, method="HEAD", headers={"Cookie": hdr})
+        opener = urllib.request.build_opener(_NoRedirect)
+        with opener.open(req, timeout=5) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
 
-    print(f"➡️ Opening: {args.url}")
-    print("ℹ️ Log in in the browser window (MFA etc.).")
-    print("ℹ️ When you see your HPE portal loaded, come back here and press ENTER.")
-    print(f"ℹ️ State will be saved to: {out_path}")
+
+def capture_in_context(context, url: str, out_path: Path, full_assets: bool = False) -> None:
+    """Run one interactive login in an existing context and save its state."""
+    if not full_assets:
+        block_heavy_assets(context)
+        stub_analytics(context)
+    page = context.pages[0] if context.pages else context.new_page()
+    # "commit" returns as soon as the navigation lands; the visible window keeps
+    # rendering while we already show the ENTER prompt (no need to wait for the SPA).
+    page.goto(url, wait_until="commit")
+
+    print("\nℹ️ State wordt automatisch bewaard zodra de login rond is...")
+    if not wait_for_login(page):
+        input("\n✅ Druk ENTER om session state op te slaan... ")
+
+    save_state(context, out_path)
+    print(f"✅ Saved state: {out_path}")
+
+
+def capture_state(url: str = HPE_HOME, out: str = "hpe_state.json", *,
+                  headless: bool = False, full_assets: bool = False,
+                  profile_dir: str | None = None) -> Path:
+    """Library entry point: capture HPE session state without going through the CLI.
+
+    Orchestrators can import this and call it in-process, skipping the Python
+    startup + driver-boot cost of exec'ing the script per capture.
+    Returns the path the state was written to.
+    """
+    from playwright.sync_api import sync_playwright
+
+    out_path = Path(out).absolute()
+    if profile_dir is None:
+        profile_dir = out_path.with_suffix("").as_posix() + "_profile"
 
     with sync_playwright() as p:
         try:
-            browser = p.chromium.launch(headless=False)
+            context = p.chromium.launch_persistent_context(
+                user_data_dir=profile_dir,
+                headless=headless,
+                args=CHROMIUM_ARGS,
+            )
         except Exception as e:
             msg = str(e)
             if "Executable doesn't exist" in msg or "playwright install" in msg:
@@ -31,16 +245,125 @@ def main():
                 raise SystemExit(2)
             raise
 
+        capture_in_context(context, url, out_path, full_assets)
+        context.close()
+    return out_path
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="hpe_state.json", help="Output storage state json (cookies/session)")
+    ap.add_argument("--url", default=HPE_HOME, help="Start URL (default: HPE Support Center home)")
+    ap.add_argument("--cookie-file", default=None,
+                    help="Existing cookie jar (JSON list). Skips the GUI: runs headless, injects the "
+                         "cookies and saves the state immediately (for scheduled refresh jobs).")
+    ap.add_argument("--full-assets", action="store_true",
+                    help="Do not block images/fonts/media (default blocks them to speed up the login page)")
+    ap.add_argument("--cdp-url", default=None,
+                    help="Attach to a running Chromium (e.g. ws://127.0.0.1:9222/...) instead of launching one. "
+                         "Start it with: chrome --remote-debugging-port=9222 --user-data-dir=<profile>")
+    ap.add_argument("--no-emoji", action="store_true",
+                    help="Plain [i]/[ok] prefixes (emoji rendering is slow on some Windows consoles)")
+    ap.add_argument("--force", action="store_true",
+                    help="Always relaunch the browser, even if the existing state file still looks valid")
+    ap.add_argument("--probe-url", default=None,
+                    help="Authenticated endpoint used to verify an existing state file (must reject "
+                         "anonymous requests). Without it the browser flow always runs.")
+    ap.add_argument("--urls-file", default=None,
+                    help="File with one 'url out_path' per line: capture several tenants with ONE "
+                         "browser launch (fresh context per line).")
+    args = ap.parse_args()
+
+    # Import after parse_args so --help doesn't pay Playwright's import cost;
+    # absolute() is pure string work (resolve() stats the filesystem).
+    from playwright.sync_api import sync_playwright
+
+    if args.urls_file:
+        # Multi-tenant capture: one Chromium launch, a lightweight fresh context
+        # per tenant, instead of paying the full browser startup N times.
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=False, args=CHROMIUM_ARGS)
+            for line in Path(args.urls_file).read_text(encoding="utf-8").splitlines():
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split()
+                url = parts[0]
+                out = Path(parts[1]).absolute() if len(parts) > 1 else Path(args.out).absolute()
+                context = browser.new_context()
+                capture_in_context(context, url, out, args.full_assets)
+                context.close()
+            browser.close()
+        return
+
+    out_path = Path(args.out).absolute()
+
+    # Happy path: fresh state that still authenticates means no browser at all.
+    # Requires --probe-url: the public home answers 200 to anonymous callers
+    # too, so probing it cannot prove the session is still accepted.
+    if out_path.exists() and not args.force and args.probe_url \
+            and state_still_valid(out_path, args.probe_url):
+        print(f"✅ Bestaande state is nog geldig: {out_path} (gebruik --force om opnieuw in te loggen)")
+        return
+
+    # Persistent profile next to the state file: reuses Chromium's disk/code cache
+    # across runs, so the heavy HPE SSO bundles load from cache after the first login.
+    profile_dir = out_path.with_suffix("").as_posix() + "_profile"
+
+    # One buffered write + flush instead of four print() round-trips; each emoji
+    # print can trigger a font-fallback stall on slow Windows consoles.
+    banner = [
+        f"➡️ Opening: {args.url}",
+        "ℹ️ Log in in the browser window (MFA etc.).",
+        "ℹ️ When you see your HPE portal loaded, come back here and press ENTER.",
+        f"ℹ️ State will be saved to: {out_path}",
+    ]
+    if args.no_emoji:
+        banner = ["[i] " + line.split(" ", 1)[1] for line in banner]
+    sys.stdout.write("\n".join(banner) + "\n")
+    sys.stdout.flush()
+
+    if args.cookie_file or args.cdp_url:
+        with sync_playwright() as p:
+            _cli_fast_paths(p, args, out_path)
+        return
+
+    capture_state(args.url, str(out_path), full_assets=args.full_assets, profile_dir=profile_dir)
+
+
+def _cli_fast_paths(p, args, out_path: Path) -> None:
+    """Cookie-jar and CDP-attach capture modes (no fresh headed launch needed)."""
+    if args.cookie_file:
+        # Headless fast path: no visible window needed when we already have a
+        # cookie jar, so skip the full headed Chromium launch and the ENTER wait.
+        cookies = json.loads(Path(args.cookie_file).read_text(encoding="utf-8"))
+        if isinstance(cookies, dict):
+            cookies = cookies.get("cookies", [])
+        browser = p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
         context = browser.new_context()
+        context.add_cookies(cookies)
+        if not args.full_assets:
+            block_heavy_assets(context)
         page = context.new_page()
         page.goto(args.url, wait_until="domcontentloaded")
-
-        input("\n✅ Druk ENTER om session state op te slaan... ")
-
-        context.storage_state(path=str(out_path))
+        try:
+            if page.locator("a[data-key='SignIn'], a[href*='/home/signin']").count() > 0:
+                print("⚠️ Cookie jar lijkt verlopen (Sign In zichtbaar); state wordt toch bewaard.")
+        except Exception:
+            pass
+        save_state(context, out_path)
         browser.close()
+        print(f"✅ Saved state: {out_path}")
+        return
 
-    print(f"✅ Saved state: {out_path}")
+    if args.cdp_url:
+        # Warm-browser fast path: skip Chromium startup entirely by attaching to a
+        # long-lived instance. Disconnecting afterwards keeps that browser alive.
+        browser = p.chromium.connect_over_cdp(args.cdp_url)
+        context = browser.contexts[0] if browser.contexts else browser.new_context()
+        capture_in_context(context, args.url, out_path, args.full_assets)
+        browser.close()  # disconnect only; the external Chromium keeps running
+        return
 
 if __name__ == "__main__":
     main()
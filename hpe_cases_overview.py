@@ -1,8 +1,27 @@
 import argparse
 import csv
+import functools
+import hashlib
 import json
-import re
+# Optional: google-re2 gives linear-time (no backtracking) matching on large
+# Communications dumps. None of our patterns need backrefs/lookarounds, so it
+# is a drop-in; stdlib re remains the default when re2 isn't installed.
+try:
+    import re2 as re  # type: ignore
+except ImportError:
+    import re
+# Patterns handed to Playwright (get_by_role name=, wait_for_url) must be
+# stdlib re.Pattern objects; re2 pattern objects are silently not matched.
+import re as _stdre
+# Optional: orjson encodes dict-heavy payloads ~2x faster than stdlib json
+# and returns bytes directly. stdlib json remains the default.
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
 import os
+import queue
+import threading
 import time
 import subprocess
 import sys
@@ -14,6 +33,7 @@ try:
 except Exception:
     pass
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
@@ -41,7 +61,7 @@ _DEADLINE = None  # type: float | None
 def _check_deadline():
     """Raise RuntimeError('GLOBAL_TIMEOUT') if a global deadline is configured and exceeded."""
     global _DEADLINE
-    if _DEADLINE and time.time() > _DEADLINE:
+    if _DEADLINE and time.monotonic() > _DEADLINE:
         raise RuntimeError('GLOBAL_TIMEOUT')
 
 
@@ -60,6 +80,23 @@ FIELD_LABELS: Dict[str, List[str]] = {
     'case_no': ['Case', 'Case:', 'Case Number', 'Case number'],
 }
 
+# lower(label) -> field key, built once (FIELD_LABELS is static and
+# parse_line_pairs is called for every case's details AND comms text).
+_LABEL_MAP: Dict[str, str] = {
+    lbl.lower(): key for key, labels in FIELD_LABELS.items() for lbl in labels
+}
+
+# "label:" prefixes, longest first, for the fast no-split colon path in
+# parse_line_pairs (a startswith probe beats split+strip+dict on most lines).
+_LABEL_PREFIXES: Tuple[Tuple[str, str], ...] = tuple(
+    sorted(((lbl + ":", key) for lbl, key in _LABEL_MAP.items()),
+           key=lambda item: -len(item[0]))
+)
+
+# Shared "a case number is on screen" probe. Defining it once keeps the
+# browser-side regex parse out of the 250-500 ms poll loops that reuse it.
+_CASE_NUMBER_SELECTOR = "text=/\\bCase\\s+\\d{7,12}\\b/"
+
 
 def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
@@ -71,10 +108,61 @@ def save_text(path: Path, text: str):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(text or "", encoding="utf-8", errors="ignore")
 
+def _finalize_output(f, tmp_path: Path, final_path: Path) -> None:
+    """Promote a streamed .tmp artifact to its final name, durably.
+
+    One flush+fsync+rename per file (never per row); readers only ever see
+    the previous complete file or the new complete one.
+    """
+    f.flush()
+    try:
+        os.fsync(f.fileno())
+    except Exception:
+        pass
+    f.close()
+    os.replace(tmp_path, final_path)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist the renames themselves (best-effort; no-op on Windows)."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except Exception:
+        pass
+
+
 def save_json(path: Path, obj):
     path.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+        return
     path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
 
+# Compiled once: redact_sensitive runs on every details/comms extraction.
+# One compiled pattern per label, applied IN THIS ORDER: the line passes all
+# run before the inline ones, and the \s*:\s* whitespace deliberately spans
+# the newline after a value-less label so a bare secret on the next line is
+# still caught. Both properties are order-dependent (later passes see earlier
+# redactions), so the passes must not be fused into one alternation - a
+# single left-to-right scan lets a mid-line label consume the next line's
+# label as its "value" and leaves that line's secret in cleartext.
+_REDACT_SUBS: Tuple[Any, ...] = tuple(
+    re.compile(p) for p in (
+        r"(?im)^\s*(Password\s*:\s*).+$",
+        r"(?im)^\s*(Password\s*Token\s*:\s*).+$",
+        r"(?im)^\s*(Wrap\s*token\s*:\s*).+$",
+        r"(?im)^\s*(Token\s*:\s*).+$",
+        r"(?i)(Password\s*:\s*)[^\s\r\n]+",
+        r"(?i)(Password\s*Token\s*:\s*)[^\s\r\n]+",
+        r"(?i)(Wrap\s*token\s*:\s*)[^\s\r\n]+",
+    )
+)
+
+
 def redact_sensitive(text: str) -> str:
     """Redact obvious secrets from Communications export (passwords, tokens).
 
@@ -82,58 +170,111 @@ def redact_sensitive(text: str) -> str:
     """
     if not text:
         return ""
-    t = text
+    # Cheap substring gate: most comms blobs carry no secrets at all, and
+    # every redaction pass is triggered by one of these two words.
+    low = text.lower()
+    if "password" not in low and "token" not in low:
+        return text
+    for rx in _REDACT_SUBS:
+        text = rx.sub(r"\1[REDACTED]", text)
+    return text
 
-    # Line-based (handles indentation)
-    t = re.sub(r"(?im)^\s*(Password\s*:\s*).+$", r"\1[REDACTED]", t)
-    t = re.sub(r"(?im)^\s*(Password\s*Token\s*:\s*).+$", r"\1[REDACTED]", t)
-    t = re.sub(r"(?im)^\s*(Wrap\s*token\s*:\s*).+$", r"\1[REDACTED]", t)
-    t = re.sub(r"(?im)^\s*(Token\s*:\s*).+$", r"\1[REDACTED]", t)
 
-    # Inline fallbacks (covers 'Password: xyz' in the middle of a line)
-    t = re.sub(r"(?i)(Password\s*:\s*)([^\s\r\n]+)", r"\1[REDACTED]", t)
-    t = re.sub(r"(?i)(Password\s*Token\s*:\s*)([^\s\r\n]+)", r"\1[REDACTED]", t)
-    t = re.sub(r"(?i)(Wrap\s*token\s*:\s*)([^\s\r\n]+)", r"\1[REDACTED]", t)
+def _safe_visible(loc) -> bool:
+    """is_visible() that never raises (detached frames, closed targets)."""
+    try:
+        return loc.is_visible()
+    except Exception:
+        return False
 
-    return t
 
 def first_visible_locator(page, selector_list):
+    # is_visible() already returns False for zero matches, so the extra
+    # count() round-trip per selector buys nothing.
     for sel in selector_list:
         loc = page.locator(sel).first
-        try:
-            if loc.count() > 0 and loc.is_visible():
-                return loc
-        except Exception:
-            continue
+        if _safe_visible(loc):
+            return loc
     return None
 
 
-def first_visible_locator_anywhere(page, selector_list):
-    """Find first visible locator in main page OR any child frame."""
-    loc = first_visible_locator(page, selector_list)
-    if loc:
-        return loc
+def _snapshot_frames(page):
+    """One (main_frame, child_frames) snapshot for a whole polling tick.
+
+    page.frames / page.main_frame are IPC calls; helpers that probe frames can
+    take the snapshot as an argument so a 250 ms poll loop pays for it once
+    per tick instead of once per probe.
+    """
     try:
-        frames = list(page.frames)
         main = page.main_frame
+        return (main, [fr for fr in page.frames if fr != main])
     except Exception:
-        frames, main = [], None
+        return (None, [])
+
+
+def _first_visible_in_frame(fr, selector_list):
+    """First visible match in one frame, preferring a single batched query.
 
-    for fr in frames:
+    Joining the selectors with "," lets Playwright resolve all of them in one
+    round-trip instead of one per selector; if the combined selector is invalid
+    (mixed engines etc.) we fall back to the per-selector loop.
+    """
+    try:
+        loc = fr.locator(", ".join(selector_list))
+        for i in range(min(loc.count(), 25)):
+            item = loc.nth(i)
+            if item.is_visible():
+                return item
+        return None
+    except Exception:
+        pass
+    for sel in selector_list:
         try:
-            if main is not None and fr == main:
-                continue
+            l = fr.locator(sel).first
         except Exception:
-            pass
-        for sel in selector_list:
-            try:
-                l = fr.locator(sel).first
-                if l.count() > 0 and l.is_visible():
-                    return l
-            except Exception:
-                continue
+            continue
+        if _safe_visible(l):
+            return l
     return None
 
+
+def first_visible_locator_anywhere(page, selector_list, frames=None):
+    """Find first visible locator in main page OR any child frame.
+
+    frames: optional _snapshot_frames(page) result, for poll loops that probe
+    several times per tick.
+    """
+    loc = first_visible_locator(page, selector_list)
+    if loc:
+        return loc
+    if frames is None:
+        frames = _snapshot_frames(page)
+    _, children = frames
+
+    for fr in children:
+        l = _first_visible_in_frame(fr, selector_list)
+        if l:
+            return l
+    return None
+
+# Size up all candidates in one evaluate instead of a bounding_box round-trip
+# per selector; non-CSS selectors are skipped and handled by the fallback loop.
+_LARGEST_JS = """
+(sels) => {
+  let bi = -1, ba = -1;
+  sels.forEach((s, i) => {
+    let e = null;
+    try { e = document.querySelector(s); } catch (err) { return; }
+    if (!e || !(e.offsetWidth || e.offsetHeight || e.getClientRects().length)) return;
+    const r = e.getBoundingClientRect();
+    const v = r.width * r.height;
+    if (v > ba) { ba = v; bi = i; }
+  });
+  return bi;
+}
+"""
+
+
 def largest_visible_locator(page, selector_list):
     """Pick the *largest* visible element from a selector list.
 
@@ -141,6 +282,13 @@ def largest_visible_locator(page, selector_list):
     containing "Cases" vs the real list container). Choosing the first match can
     accidentally scope to only one status group.
     """
+    try:
+        idx = page.evaluate(_LARGEST_JS, list(selector_list))
+        if isinstance(idx, int) and idx >= 0:
+            return page.locator(selector_list[idx]).first
+    except Exception:
+        pass
+
     best = None
     best_area = -1.0
     for sel in selector_list:
@@ -180,11 +328,114 @@ def atomic_write_storage_state(context, state_path: Path) -> None:
 
     Many SSO sessions use *rolling* cookies/tokens. If we never write the refreshed
     state back, the on-disk state expires after ~24h and the user must re-login.
+
+    Only HPE origins are kept: auth rides on hpe.com cookies/localStorage and
+    the third-party origin blobs are the bulk of the serialized bytes.
     """
+    state = context.storage_state()
+    try:
+        state["origins"] = [o for o in state.get("origins", []) if "hpe.com" in o.get("origin", "")]
+    except Exception:
+        pass
     tmp = state_path.with_suffix(state_path.suffix + ".tmp")
-    context.storage_state(path=str(tmp))
+    tmp.write_text(json.dumps(state, separators=(",", ":"), ensure_ascii=False), encoding="utf-8")
     tmp.replace(state_path)
 
+# Throttle for storage-state refreshes: serializing the state (an IPC call
+# plus JSON dump plus disk replace) on every relogin is redundant when the
+# session bounces several times in a short window.
+# None = never written. Not 0.0: time.monotonic() is time-since-boot, so on
+# a host up for under the interval (the boot-time scheduled-task case) a 0.0
+# sentinel would wrongly throttle the first write of the run.
+_LAST_STATE_WRITE: Optional[float] = None
+_STATE_WRITE_MIN_INTERVAL_S = 300.0
+
+
+def maybe_write_storage_state(context, state_path: Path, force: bool = False) -> bool:
+    """atomic_write_storage_state, at most once per throttle interval.
+
+    force=True (end of run) always writes so rolling cookies land on disk.
+    """
+    global _LAST_STATE_WRITE
+    now = time.monotonic()
+    if (not force and _LAST_STATE_WRITE is not None
+            and (now - _LAST_STATE_WRITE) < _STATE_WRITE_MIN_INTERVAL_S):
+        return False
+    atomic_write_storage_state(context, state_path)
+    _LAST_STATE_WRITE = now
+    return True
+
+
+# Warm contexts keyed by storage-state path. A plain CLI run still launches
+# one browser and one context; the pool pays off for in-process callers that
+# drive several runs from one interpreter (browser startup is the ~1-3 s cost,
+# cross-process reuse is not possible).
+_CONTEXT_POOL: Dict[str, Any] = {}
+
+
+def get_or_create_context(browser, state_path: Path):
+    """Return a pooled, still-usable context for this state file, or a new one."""
+    key = str(state_path)
+    ctx = _CONTEXT_POOL.get(key)
+    if ctx is not None:
+        try:
+            # Liveness probe must round-trip to the browser: .pages is
+            # client-side state and never raises on a closed context.
+            ctx.cookies()
+            return ctx
+        except Exception:
+            _CONTEXT_POOL.pop(key, None)
+    ctx = browser.new_context(storage_state=str(state_path)) if state_path.exists() else browser.new_context()
+    _CONTEXT_POOL[key] = ctx
+    return ctx
+
+
+def release_context(ctx) -> None:
+    """Close a context and drop its pool entry so reuse never sees a corpse."""
+    for key, pooled in list(_CONTEXT_POOL.items()):
+        if pooled is ctx:
+            _CONTEXT_POOL.pop(key, None)
+    try:
+        ctx.close()
+    except Exception:
+        pass
+
+
+def _install_asset_cache(context, cache_dir: Path) -> None:
+    """Serve static portal assets (JS/CSS/fonts/images) from a local disk cache.
+
+    The SPA bundle is megabytes and rarely changes run-to-run; replaying cached
+    bytes makes warm navigations mostly local. Opt-in via the HPE_ASSET_CACHE
+    env var because it trades freshness for speed.
+    """
+    import hashlib
+    import mimetypes
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except Exception:
+        return
+
+    def _handle(route):
+        url = route.request.url.split("?", 1)[0]
+        try:
+            p = cache_dir / hashlib.sha1(url.encode("utf-8")).hexdigest()
+            if p.exists():
+                ctype = mimetypes.guess_type(url)[0] or "application/octet-stream"
+                return route.fulfill(body=p.read_bytes(), headers={"Content-Type": ctype})
+            resp = route.fetch()
+            body = resp.body()
+            if resp.ok:
+                p.write_bytes(body)
+            return route.fulfill(response=resp, body=body)
+        except Exception:
+            try:
+                return route.continue_()
+            except Exception:
+                return None
+
+    context.route("**/*.{js,css,woff,woff2,png,svg,gif,jpg,jpeg}", _handle)
+
+
 def is_session_expired(page, cfg) -> bool:
     # Expired/failed-auth banners sometimes render inside IdP frames
     return any_text_present_anywhere(page, cfg.get("session_expired_text_any", []))
@@ -198,7 +449,7 @@ def log_login_status(page, cfg) -> bool:
         return True
     # When already on cases page, any case pattern is good enough.
     try:
-        if page.locator("text=/\\bCase\\s+\\d{7,12}\\b/").count() > 0:
+        if page.locator(_CASE_NUMBER_SELECTOR).count() > 0:
             return True
     except Exception:
         pass
@@ -209,54 +460,80 @@ def any_text_present(page, texts):
     for s in texts:
         try:
             loc = page.locator(f"text={s}").first
-            if loc.count() > 0:
-                try:
-                    if loc.is_visible():
-                        return True
-                except Exception:
-                    # detached / not visible
-                    pass
         except Exception:
             continue
+        if _safe_visible(loc):  # detached / not visible -> False
+            return True
     return False
 
-def any_text_present_anywhere(page, texts):
+def any_text_present_anywhere(page, texts, frames=None):
     """Check for any of the given texts in page OR child frames (VISIBLE only)."""
     if any_text_present(page, texts):
         return True
-    try:
-        frames = list(page.frames)
-        main = page.main_frame
-    except Exception:
-        frames, main = [], None
+    if frames is None:
+        frames = _snapshot_frames(page)
+    _, children = frames
+
+    # One batched :text(...) query per frame instead of one query per string.
+    combined = ", ".join(':text("{}")'.format(s.replace('"', '\\"')) for s in texts)
 
-    for fr in frames:
+    for fr in children:
         try:
-            if main is not None and fr == main:
-                continue
+            loc = fr.locator(combined)
+            for i in range(min(loc.count(), 25)):
+                if loc.nth(i).is_visible():
+                    return True
+            continue
         except Exception:
             pass
         for s in texts:
             try:
                 loc = fr.locator(f"text={s}").first
-                if loc.count() > 0:
-                    try:
-                        if loc.is_visible():
-                            return True
-                    except Exception:
-                        pass
             except Exception:
                 continue
+            if _safe_visible(loc):
+                return True
+    return False
+
+
+def any_text_present_anywhere_fast(page, texts) -> bool:
+    """PRESENCE-only text check via one evaluate per frame.
+
+    Much cheaper than the locator-based variant (one IPC call per frame instead
+    of per string), but does NOT require visibility — only use it for texts
+    that never linger in hidden DOM (auth splash screens etc.).
+    """
+    if not texts:
+        return False
+    js = "(ts) => { const t = (document.body && document.body.innerText) || ''; return ts.some(s => t.includes(s)); }"
+    try:
+        if page.evaluate(js, list(texts)):
+            return True
+    except Exception:
+        pass
+    _, children = _snapshot_frames(page)
+    for fr in children:
+        try:
+            if fr.evaluate(js, list(texts)):
+                return True
+        except Exception:
+            continue
     return False
 
 
 def is_authenticating(page, cfg) -> bool:
     texts = cfg.get("authenticating_text_any") or []
-    return any_text_present_anywhere(page, texts)
+    # Authenticating splash text never sits around hidden, so the cheap
+    # presence-only probe is safe here.
+    return any_text_present_anywhere_fast(page, texts)
 
 
 def dismiss_cookie_banner(page, cfg) -> bool:
     """Best-effort accept cookie banner (OneTrust etc.) to unblock clicks."""
+    # Once accepted it stays gone for the page; skip the selector queries on
+    # every later navigation (rearm_banner_flags resets after a fresh login).
+    if getattr(page, "_cookie_banner_done", False):
+        return False
     sels = cfg.get("cookie_accept_any") or []
     if not sels:
         return False
@@ -266,6 +543,7 @@ def dismiss_cookie_banner(page, cfg) -> bool:
     try:
         btn.click(timeout=8000, force=True)
         page.wait_for_timeout(800)
+        page._cookie_banner_done = True
         return True
     except Exception:
         return False
@@ -279,11 +557,11 @@ def wait_for_portal_state(page, cfg, timeout_ms: int = 10000) -> None:
     - a visible sign-out trigger
     - a login/auth page (auth.hpe.com or visible login form)
     """
-    start = time.time()
+    deadline = time.monotonic() + timeout_ms / 1000.0
     signout_texts = cfg.get("signout_text_any") or ["Sign Out", "Sign out", "Log out", "Logout", "Afmelden", "Uitloggen"]
     signin_triggers = cfg.get("signin_trigger_any") or []
 
-    while (time.time() - start) * 1000 < timeout_ms:
+    while time.monotonic() < deadline:
         try:
             if page.is_closed():
                 return
@@ -301,14 +579,16 @@ def wait_for_portal_state(page, cfg, timeout_ms: int = 10000) -> None:
         except Exception:
             pass
 
+        frames = _snapshot_frames(page)
+
         try:
-            if first_visible_locator_anywhere(page, signin_triggers):
+            if first_visible_locator_anywhere(page, signin_triggers, frames=frames):
                 return
         except Exception:
             pass
 
         try:
-            if any_text_present_anywhere(page, signout_texts):
+            if any_text_present_anywhere(page, signout_texts, frames=frames):
                 return
         except Exception:
             pass
@@ -363,10 +643,47 @@ def ensure_page_alive(page, context):
             return
 
 
+# Tri-state logged-out probe: one evaluate instead of up to four separate DOM
+# queries. innerText only contains rendered text, which matches the
+# visible-only semantics of the locator-based checks closely enough here.
+_LOGGED_OUT_JS = """
+(args) => {
+  const text = (document.body && document.body.innerText) || '';
+  if (args.signout.some(s => text.includes(s))) return 'in';
+  const vis = (sel) => {
+    try {
+      const e = document.querySelector(sel);
+      return !!(e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length));
+    } catch (e) { return false; }
+  };
+  const has = (sel) => { try { return !!document.querySelector(sel); } catch (e) { return false; } };
+  if (args.triggers.some(vis)) return 'out';
+  if (has("a[data-key='SignIn'], a[href*='/hpesc/public/home/signin'], a[href*='/home/signin']")) return 'out';
+  if (args.loggedout.some(s => text.includes(s))) return 'out';
+  return 'unknown';
+}
+"""
+
+
 def is_logged_out(page, cfg) -> bool:
     """Detect logged-out state on the HPE portal home (no login form yet)."""
     # If we can see a Sign In trigger and we do NOT see a Sign Out trigger, treat as logged out.
     signout_texts = cfg.get("signout_text_any") or ["Sign Out", "Sign out", "Log out", "Logout", "Afmelden", "Uitloggen"]
+
+    # Fast combined probe on the main document; fall through to the
+    # locator/frame-based checks only when it can't decide.
+    try:
+        state = page.evaluate(_LOGGED_OUT_JS, {
+            "signout": list(signout_texts),
+            "triggers": list(cfg.get("signin_trigger_any") or []),
+            "loggedout": list(cfg.get("logged_out_text_any") or []),
+        })
+        if state == "in":
+            return False
+        if state == "out":
+            return True
+    except Exception:
+        pass
     try:
         if any_text_present_anywhere(page, signout_texts):
             return False
@@ -492,7 +809,11 @@ def is_login_screen(page, cfg) -> bool:
     return False
 
 
-def perform_login(page, context, cfg, home_url: str, username: str, password: str, timeout_ms: int = 120000) -> bool:
+_CONNECT_URL_RX = _stdre.compile(r".*support\.hpe\.com/connect/s/.*")
+
+
+def perform_login(page, context, cfg, home_url: str, username: str, password: str, timeout_ms: int = 120000,
+                  clear_storage: bool = False) -> bool:
     """More robust auto-login (no MFA).
 
     Strategy:
@@ -529,7 +850,7 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
         except Exception:
             return
 
-    def _first_visible_generic_user_input():
+    def _first_visible_generic_user_input(frames=None):
         candidates = [
             "input[type='email']",
             "input[autocomplete='username']",
@@ -540,16 +861,16 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
             "form input[type='text']",
             "input[type='text']",
         ]
-        return first_visible_locator_anywhere(page, candidates)
+        return first_visible_locator_anywhere(page, candidates, frames=frames)
 
-    def _first_visible_generic_pass_input():
+    def _first_visible_generic_pass_input(frames=None):
         candidates = [
             "input[type='password']",
             "input[autocomplete='current-password']",
             "input[name*='pass' i]",
             "input[id*='pass' i]",
         ]
-        return first_visible_locator_anywhere(page, candidates)
+        return first_visible_locator_anywhere(page, candidates, frames=frames)
 
     def _click_first_visible(selectors):
         loc = first_visible_locator_anywhere(page, selectors)
@@ -571,7 +892,7 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
     sels_next   = cfg.get("login_next_any") or []
     sels_submit = cfg.get("login_submit_any") or []
 
-    start = time.time()
+    deadline = time.monotonic() + timeout_ms / 1000.0
 
     # Always start from stable sign-in endpoint
     try:
@@ -587,7 +908,16 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
             _dump_debug("navfail")
             return False
 
-    while (time.time() - start) * 1000 < timeout_ms:
+    if clear_storage:
+        # One-shot wipe of stale web storage now that a document exists.
+        # (context.add_init_script is NOT one-shot: it re-runs on every later
+        # document and would keep wiping the fresh session after re-login.)
+        try:
+            page.evaluate("try { localStorage.clear(); sessionStorage.clear(); } catch(e){}")
+        except Exception:
+            pass
+
+    while time.monotonic() < deadline:
         page = ensure_page_alive(page, context)
 
         # Cookie banners can re-appear after redirects
@@ -608,7 +938,7 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
         try:
             if is_authenticating(page, cfg):
                 try:
-                    page.wait_for_url(re.compile(r".*support\.hpe\.com/connect/s/.*"), timeout=60000)
+                    page.wait_for_url(_CONNECT_URL_RX, timeout=60000)
                 except Exception:
                     pass
         except Exception:
@@ -619,13 +949,15 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
             _dump_debug("sessionexpired")
             return False
 
-        # Find inputs (selectors first, then generic fallback)
-        user_box = first_visible_locator_anywhere(page, sels_user) if sels_user else None
+        # Find inputs (selectors first, then generic fallback). One frame
+        # snapshot serves all four lookups in this tick.
+        frames = _snapshot_frames(page)
+        user_box = first_visible_locator_anywhere(page, sels_user, frames=frames) if sels_user else None
         if not user_box:
-            user_box = _first_visible_generic_user_input()
-        pass_box = first_visible_locator_anywhere(page, sels_pass) if sels_pass else None
+            user_box = _first_visible_generic_user_input(frames)
+        pass_box = first_visible_locator_anywhere(page, sels_pass, frames=frames) if sels_pass else None
         if not pass_box:
-            pass_box = _first_visible_generic_pass_input()
+            pass_box = _first_visible_generic_pass_input(frames)
 
         # If we have username but no password yet: fill + Next
         if user_box and (not pass_box):
@@ -708,7 +1040,7 @@ def perform_login(page, context, cfg, home_url: str, username: str, password: st
 
             # Wait for redirect back
             try:
-                page.wait_for_url(re.compile(r".*support\.hpe\.com/connect/s/.*"), timeout=60000)
+                page.wait_for_url(_CONNECT_URL_RX, timeout=60000)
             except Exception:
                 try:
                     page.wait_for_timeout(2000)
@@ -747,60 +1079,78 @@ def recover_session(page, context, cfg, home_url: str, username: str, password:
         context.clear_cookies()
     except Exception:
         pass
-    try:
-        page.goto(home_url, wait_until="domcontentloaded", timeout=60000)
-        page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch(e){} }")
-    except Exception:
-        pass
-    ok = perform_login(page, context, cfg, home_url, username, password, timeout_ms=120000)
+    # perform_login clears web storage once after reaching the sign-in page;
+    # that still avoids the dedicated goto(home) the old flow paid just to
+    # have a document to evaluate() against.
+    ok = perform_login(page, context, cfg, home_url, username, password, timeout_ms=120000,
+                       clear_storage=True)
     return ok
 
+# Browser-side readiness predicate: cases tab + (container or case number).
+# Runs inside the renderer so we return the moment it flips true, instead of
+# paying a >=500 ms Python poll tick plus IPC per probe.
+_READY_JS = """
+(sels) => {
+  if (!location.href.includes('tab=cases')) return false;
+  for (const s of sels) {
+    try {
+      const el = document.querySelector(s);
+      if (el && el.offsetWidth > 0 && el.offsetHeight > 0) return true;
+    } catch (e) {}
+  }
+  return /\\bCase\\s+\\d{7,12}\\b/.test((document.body && document.body.innerText) || '');
+}
+"""
+
+
 def ensure_ready(page, cfg, timeout_ms=45000):
-    start = datetime.now()
-    while (datetime.now() - start).total_seconds() * 1000 < timeout_ms:
+    deadline = time.monotonic() + timeout_ms / 1000.0
+    container_sels = cfg.get("case_list_container_any", [])
+    while time.monotonic() < deadline:
 
         # If we got redirected to auth/login, bail out early so caller can re-login.
         try:
             u = (page.url or "").lower()
             if "auth.hpe.com" in u:
                 raise RuntimeError("LOGIN_REQUIRED")
+        except RuntimeError:
+            raise
         except Exception:
             pass
         if is_login_screen(page, cfg) or is_logged_out(page, cfg) or is_authenticating(page, cfg):
             raise RuntimeError("LOGIN_REQUIRED")
 
-        # We only consider the page "ready" when we are truly on the cases tab
-        try:
-            if "tab=cases" not in (page.url or ""):
-                page.wait_for_timeout(300)
-                continue
-        except Exception:
-            pass
-
         if any_text_present_anywhere(page, cfg.get("session_expired_text_any", [])):
             raise RuntimeError("SESSION_EXPIRED")
 
-        # Prefer: case list container or a case-number pattern
-        if largest_visible_locator(page, cfg.get("case_list_container_any", [])):
-            return True
-
-        # Regex check (raw string avoids Python escape warnings)
+        # Let the browser poll for readiness; re-run the login/expired side
+        # checks above only every couple of seconds.
         try:
-            if page.locator("text=/\\bCase\\s+\\d{7,12}\\b/").count() > 0:
-                return True
-        except Exception:
-            # If the target closed mid-check, let caller retry.
-            raise
+            page.wait_for_function(_READY_JS, arg=container_sels, timeout=2000, polling=200)
+            return True
+        except PWTimeoutError:
+            continue
 
-        page.wait_for_timeout(500)
     raise RuntimeError("CASES_PAGE_NOT_READY_TIMEOUT")
 
 
 def dismiss_contract_banner(page, cfg):
+    if getattr(page, "_contract_banner_done", False):
+        return False
     if not any_text_present(page, cfg.get("contract_banner_text_any", [])):
+        page._contract_banner_done = True
         return False
 
 
+def rearm_banner_flags(page) -> None:
+    """Fresh logins can re-show the cookie/contract banners."""
+    try:
+        page._cookie_banner_done = False
+        page._contract_banner_done = False
+    except Exception:
+        pass
+
+
 def goto_cases_with_retry(page, cfg, cases_url: str, timeout_ms: int = 60000) -> None:
     """Navigate to the cases page robustly.
 
@@ -869,12 +1219,44 @@ def goto_cases_with_retry(page, cfg, cases_url: str, timeout_ms: int = 60000) ->
 MONTHS = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)"
 TS_RX = re.compile(rf"\b{MONTHS}\s+\d{{1,2}},\s+\d{{4}},\s+\d{{1,2}}:\d{{2}}\s+(AM|PM)\b")
 URL_RX = re.compile(r"https?://[^\s)>\"]+", re.I)
-HOST_LINE_RX = re.compile(r"(?i)^\s*(System Name/Host Name|System Name|Host Name)\s*:\s*(.*?)\s*$")
 HOST_TOKEN_RX = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{2,}")
+# Host and address labels fused into one compiled alternation with named
+# groups, so one pass over the comms text serves both extractors.
+META_LINE_RX = re.compile(
+    r"(?im)^\s*(?:"
+    r"(?P<host_label>System Name/Host Name|System Name|Host Name)"
+    r"|(?P<addr_label>Street|City|State|Province|Postal Code|Postcode|Zip|ZIP|Country)"
+    r")[ \t]*:[ \t]*(?P<val>.*?)\s*$"
+)
 STOP_HOST_VALUES = {"problem", "additional", "serial", "case", "event", "none", "null", "n/a"}
 DEAR_RX = re.compile(r"(?im)^\s*Dear\s+(.+?),\s*$")
+# Extractor patterns, compiled once (these run for every case)
+KEY_LINK_RX = re.compile(r"https?://[^\s)\]}>\"']+", re.I)
+EVENT_ID_RX = re.compile(r"\bEvent Id:\s*([0-9a-fA-F-]{36})\b")
+PROBLEM_DESC_RX = re.compile(r"\bProblem Description:\s*([^\r\n]{3,300})", re.I)
+AHS_LINK_RX = re.compile(r"https?://ahscatalogsearch\.it\.hpe\.com/\?log=[^\s)\]}>\"']+", re.I)
+DROPBOX_LOGIN_RX = re.compile(r"\bLogin:\s*([A-Za-z0-9._-]{3,32})\b", re.I)
+URL_HOST_RX = re.compile(r"https?://([^/]+)/?", re.I)
+# [ \t] around the colon on purpose: \s would eat the newline after an
+# empty-valued label and capture the start of the next, unrelated line.
+HOST_SYS_RX = re.compile(r"(?i)(System\s*Name/Host\s*Name|Host\s*Name|System\s*Name)[ \t]*:[ \t]*([^\r\n]{0,200})")
+HOST_TRIM_RX = re.compile(r"^([A-Za-z0-9._-]*\d)[A-Za-z]{2,}$")
+ONSITE_ENGINEER_RX = re.compile(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\s+is\s+on\s+the\s+way\s+to\s+your\s+location\b")
+ONSITE_TASK_REF_RX = re.compile(r"\bonsite\s+task\s*\(\s*([0-9]{7,12}-[0-9]{1,4})\s*\)", re.I)
+ONSITE_TASK_ID_COLON_RX = re.compile(r"\bTask\s*ID\s*[:\s]+([0-9]{4,})\b", re.I)
+ONSITE_TASK_ID_RX = re.compile(r"\bTask\s*ID\s+([0-9]{4,})\b", re.I)
+ONSITE_SCHED_STATUS_RX = re.compile(r"\bScheduling\s+Status\s+([A-Za-z][A-Za-z \-]{0,40})\b", re.I)
+ONSITE_LATEST_SVC_RX = re.compile(r"\bLatest\s+Service\s+Start\s+([A-Za-z]{3}\s+\d{1,2},\s+\d{4},?\s+\d{1,2}:\d{2}\s+[AP]M)\b")
+ONSITE_PROBE_RX = re.compile(r"onsite|on the way to your location", re.I)
+# Playwright-facing: compiled with stdlib re (see _stdre note at the imports).
+ONSITE_TAB_NAME_RX = _stdre.compile(r"Onsite\s+Service", _stdre.I)
+EXPAND_ALL_NAME_RX = _stdre.compile(r"Expand all communications", _stdre.I)
+HPE_SENDER_RX = re.compile(r"hpe support engineer|hewlett packard enterprise|hpe services", re.I)
+SUBJECT_WORD_RX = re.compile(r"subject", re.I)
 ADDR_MARKERS = ["Equipment Address", "Site Address", "Customer Address", "Address"]
-ADDR_KV_RX = re.compile(r"(?im)^\s*(Street|City|State|Province|Postal Code|Postcode|Zip|ZIP|Country)\s*:\s*(.+?)\s*$")
+# Lowered once at import: marker checks run per line of every comms body.
+_ADDR_MARKERS_EQ = frozenset(m.lower().rstrip(":") for m in ADDR_MARKERS)
+_ADDR_MARKERS_PFX = tuple(m.lower() for m in ADDR_MARKERS)
 
 def parse_line_pairs(text: str) -> Dict[str, str]:
     """Parse label/value pairs from blocks where a label is followed by a value.
@@ -883,37 +1265,45 @@ def parse_line_pairs(text: str) -> Dict[str, str]:
     """
     if not text:
         return {}
-    lines = [ln.strip() for ln in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    # splitlines() handles \r\n and \r in one C-level pass; strip lazily so
+    # blank lines never materialize a second full list of stripped strings.
+    lines = text.splitlines()
     out: Dict[str, str] = {}
+    label_map = _LABEL_MAP
 
-    # For quick lookup, map lower(label) -> field key
-    label_map: Dict[str, str] = {}
-    for key, labels in FIELD_LABELS.items():
-        for lbl in labels:
-            label_map[lbl.lower()] = key
-
-    for i, ln in enumerate(lines):
+    for i, raw in enumerate(lines):
+        ln = raw.strip()
         if not ln:
             continue
 
-        # Case: "Label: value" on same line
+        ln_lower = ln.lower()
+
+        # Case: "Label: value" on same line. Fast path: direct prefix match,
+        # no split/allocation; fall back to split for "Label : value" spacing.
         if ":" in ln:
-            left, right = ln.split(":", 1)
-            k = label_map.get(left.strip().lower())
-            if k and right.strip():
-                out.setdefault(k, right.strip())
+            for pfx, k in _LABEL_PREFIXES:
+                if ln_lower.startswith(pfx):
+                    right = ln[len(pfx):].strip()
+                    if right:
+                        out.setdefault(k, right)
+                    break
+            else:
+                left, right = ln_lower.split(":", 1)
+                k = label_map.get(left.strip())
+                if k and right.strip():
+                    out.setdefault(k, ln.split(":", 1)[1].strip())
 
-        key = label_map.get(ln.lower())
+        key = label_map.get(ln_lower)
         if not key:
             continue
 
         # Next non-empty line is value
         j = i + 1
-        while j < len(lines) and not lines[j]:
+        while j < len(lines) and not lines[j].strip():
             j += 1
         if j >= len(lines):
             continue
-        val = lines[j]
+        val = lines[j].strip()
         if not val or val in ("-", "—"):
             continue
         # Avoid capturing another label as value
@@ -923,11 +1313,48 @@ def parse_line_pairs(text: str) -> Dict[str, str]:
 
     return out
 
+_MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _ts_hits(norm: str):
+    """Find timestamp matches via a literal month-anchor prefilter.
+
+    str.find locates candidate month tokens in C, then TS_RX is anchored
+    at each candidate with match(); the regex engine never scans the bulk
+    of the text. Word-boundary semantics are preserved by the pattern's
+    own leading \\b.
+    """
+    starts = []
+    for mon in _MONTH_NAMES:
+        i = norm.find(mon)
+        while i != -1:
+            starts.append(i)
+            i = norm.find(mon, i + 3)
+    starts.sort()
+    hits = []
+    for pos in starts:
+        m = TS_RX.match(norm, pos)
+        if m:
+            hits.append((pos, m.group(0)))
+    return hits
+
+
+def normalize_newlines(text: str) -> str:
+    """Collapse \\r\\n and \\r to \\n.
+
+    Callers that can should normalize once and pass the result around:
+    str.replace returns the original object when nothing matches, so
+    re-normalizing already-clean text costs only a scan, not a copy.
+    """
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
 def split_messages(text: str):
     if not text:
         return []
-    norm = text.replace("\r\n", "\n").replace("\r", "\n")
-    hits = [(m.start(), m.group(0)) for m in TS_RX.finditer(norm)]
+    norm = normalize_newlines(text)
+    hits = _ts_hits(norm)
     if not hits:
         return []
     blocks = []
@@ -937,72 +1364,99 @@ def split_messages(text: str):
         blocks.append((ts, block))
     return blocks
 
+# A 'Subject' line on its own, then the first non-blank line after it.
+SUBJECT_BLOCK_RX = re.compile(r"(?im)^\s*subject\s*\n(?:\s*\n)*([^\r\n]+)")
+
+
 def extract_subject(block: str) -> str:
     if not block:
         return ""
-    lines = [l.strip() for l in block.splitlines()]
-    for i, l in enumerate(lines):
-        if l.lower() == "subject":
-            for j in range(i + 1, min(i + 12, len(lines))):
-                if lines[j]:
-                    return lines[j]
-    return ""
+    m = SUBJECT_BLOCK_RX.search(block)
+    return m.group(1).strip() if m else ""
 
+_MONTH_NUM = {m: i for i, m in enumerate(_MONTH_NAMES, start=1)}
+
+
+@functools.lru_cache(maxsize=4096)
 def parse_ts(ts: str):
-    for fmt in ("%b %d, %Y, %I:%M %p", "%b %d, %Y %I:%M %p"):
-        try:
-            return datetime.strptime(ts.strip(), fmt)
-        except Exception:
-            pass
-    return None
+    # The layout is fixed ("Mon DD, YYYY[,] HH:MM AM/PM"), so parse it
+    # directly instead of going through strptime's format machinery; the
+    # cache covers repeated timestamps across blocks.
+    try:
+        parts = ts.strip().replace(",", "").split()
+        mon = _MONTH_NUM[parts[0]]
+        day = int(parts[1])
+        year = int(parts[2])
+        hh, mm = parts[3].split(":")
+        hh = int(hh)
+        mm = int(mm)
+        ampm = parts[4].upper()
+        if ampm not in ("AM", "PM") or not 1 <= hh <= 12:
+            return None
+        if ampm == "PM" and hh < 12:
+            hh += 12
+        elif ampm == "AM" and hh == 12:
+            hh = 0
+        return datetime(year, mon, day, hh, mm)
+    except Exception:
+        return None
 
 def pick_last_hpe_message(blocks):
     best = None
     best_dt = None
-    for ts, block in blocks:
-        dt = parse_ts(ts)
-        low = block.lower()
-        is_hpe = ("hpe support engineer" in low) or ("hewlett packard enterprise" in low) or ("hpe services" in low)
-        has_subject = ("subject" in low)
+    # Parse each timestamp once; both the HPE filter and the fallback
+    # scoring below reuse the parsed list.
+    parsed = [(parse_ts(ts), ts, block) for ts, block in blocks]
+    for dt, ts, block in parsed:
+        # Compiled re.I search beats lowercasing each (potentially long)
+        # block just to run substring checks.
+        is_hpe = bool(HPE_SENDER_RX.search(block))
+        has_subject = bool(SUBJECT_WORD_RX.search(block))
         if not (is_hpe and has_subject):
             continue
         if dt and (best_dt is None or dt > best_dt):
             best_dt = dt
             best = (ts, block)
     if best is None and blocks:
-        scored = []
-        for ts, block in blocks:
-            dt = parse_ts(ts) or datetime.min
-            scored.append((dt, ts, block))
+        scored = [(dt or datetime.min, ts, block) for dt, ts, block in parsed]
         scored.sort(reverse=True)
         _, ts, block = scored[0]
         best = (ts, block)
     return best
 
+# URL ranking table for extract_key_links, in priority order (dropbox
+# uploads first). Kept as an ordered tuple scan on the lowered URL: a
+# single leftmost-match regex would rank by position in the URL rather
+# than by this priority.
+_KEY_LINK_RANKS = (
+    ("hprc", 0),
+    ("scts.it.hpe.com", 1),
+    ("ahscatalogsearch", 2),
+    ("support.hpe.com", 3),
+)
+
+
+def _rank_url(u: str) -> int:
+    lu = u.lower()
+    for needle, r in _KEY_LINK_RANKS:
+        if needle in lu:
+            return r
+    return 4
+
+
 def extract_key_links(text: str, limit=10):
     """Extract and rank URLs from Communications text."""
     if not text:
         return []
-    rx = re.compile(r"https?://[^\s)\]}>\"']+", re.I)
+    seen_set = set()
     seen = []
-    for m in rx.finditer(text):
+    for m in KEY_LINK_RX.finditer(text):
         url = m.group(0).strip().rstrip(".,;\"'")
-        if url not in seen:
+        if url not in seen_set:
+            seen_set.add(url)
             seen.append(url)
 
-    def rank(u: str) -> int:
-        lu = u.lower()
-        if "hprc" in lu:
-            return 0
-        if "scts.it.hpe.com" in lu:
-            return 1
-        if "ahscatalogsearch" in lu:
-            return 2
-        if "support.hpe.com" in lu:
-            return 3
-        return 4
-
-    seen.sort(key=rank)
+    seen.sort(key=_rank_url)
     return seen[:limit]
 
 
@@ -1010,11 +1464,12 @@ def extract_key_links(text: str, limit=10):
 def extract_event_ids(text: str):
     if not text:
         return []
-    rx = re.compile(r"\bEvent Id:\s*([0-9a-fA-F-]{36})\b")
+    seen_set = set()
     seen = []
-    for m in rx.finditer(text):
+    for m in EVENT_ID_RX.finditer(text):
         v = m.group(1)
-        if v not in seen:
+        if v not in seen_set:
+            seen_set.add(v)
             seen.append(v)
     return seen
 
@@ -1022,11 +1477,12 @@ def extract_event_ids(text: str):
 def extract_problem_descriptions(text: str, limit: int = 5):
     if not text:
         return []
-    rx = re.compile(r"\bProblem Description:\s*([^\r\n]{3,300})", re.I)
+    out_set = set()
     out = []
-    for m in rx.finditer(text):
+    for m in PROBLEM_DESC_RX.finditer(text):
         v = m.group(1).strip()
-        if v and v not in out:
+        if v and v not in out_set:
+            out_set.add(v)
             out.append(v)
         if len(out) >= limit:
             break
@@ -1036,11 +1492,12 @@ def extract_problem_descriptions(text: str, limit: int = 5):
 def extract_ahs_links(text: str, limit: int = 5):
     if not text:
         return []
-    rx = re.compile(r"https?://ahscatalogsearch\.it\.hpe\.com/\?log=[^\s)\]}>\"']+", re.I)
+    out_set = set()
     out = []
-    for m in rx.finditer(text):
+    for m in AHS_LINK_RX.finditer(text):
         u = m.group(0).strip().rstrip(".,;\"'")
-        if u not in out:
+        if u not in out_set:
+            out_set.add(u)
             out.append(u)
         if len(out) >= limit:
             break
@@ -1051,24 +1508,95 @@ def extract_dropbox_info(text: str):
     """Return (dropbox_hosts, logins) from HPRC instructions."""
     if not text:
         return ([], [])
-    hosts = []
-    logins = []
+    hosts, hosts_seen = [], set()
+    logins, logins_seen = [], set()
     for u in extract_key_links(text, limit=50):
         lu = u.lower()
         if "hprc" in lu or "hprc-h" in lu:
             # normalize host
-            m = re.match(r"https?://([^/]+)/?", u, re.I)
+            m = URL_HOST_RX.match(u)
             if m:
                 h = m.group(1)
-                if h not in hosts:
+                if h not in hosts_seen:
+                    hosts_seen.add(h)
                     hosts.append(h)
-    rx_login = re.compile(r"\bLogin:\s*([A-Za-z0-9._-]{3,32})\b", re.I)
-    for m in rx_login.finditer(text):
+    for m in DROPBOX_LOGIN_RX.finditer(text):
         v = m.group(1).strip()
-        if v not in logins:
+        if v not in logins_seen:
+            logins_seen.add(v)
             logins.append(v)
     return (hosts, logins)
 
+# Fused artifact scanner: events / problem descriptions / URLs in ONE pass
+# over the comms text instead of one full scan per extractor. Scoped (?i:)
+# groups keep the per-pattern case-sensitivity of the standalone regexes.
+ARTIFACT_RX = re.compile(
+    r"\bEvent Id:\s*(?P<event_id>[0-9a-fA-F-]{36})\b"
+    r"|(?i:\bProblem Description:\s*(?P<problem_desc>[^\r\n]{3,300}))"
+    r"|(?P<url>(?i:https?://[^\s)\]}>\"']+))"
+)
+
+
+def extract_all_comms_artifacts(text: str) -> Dict[str, List[str]]:
+    """Single-scan version of the per-case comms extractors.
+
+    Returns event_ids, problem_descriptions (max 5), ahs_links (max 5),
+    dropbox_hosts and dropbox_logins, matching the standalone extractors.
+    """
+    out: Dict[str, List[str]] = {
+        "event_ids": [],
+        "problem_descriptions": [],
+        "ahs_links": [],
+        "dropbox_hosts": [],
+        "dropbox_logins": [],
+    }
+    if not text:
+        return out
+    seen = {k: set() for k in out}
+
+    def add(key: str, val: str, limit: int = 0):
+        if not val or val in seen[key]:
+            return
+        if limit and len(out[key]) >= limit:
+            return
+        seen[key].add(val)
+        out[key].append(val)
+
+    def add_url(raw: str):
+        url = raw.strip().rstrip(".,;\"'")
+        if not url:
+            return
+        if AHS_LINK_RX.match(url):
+            add("ahs_links", url, limit=5)
+        if "hprc" in url.lower():
+            hm = URL_HOST_RX.match(url)
+            if hm:
+                add("dropbox_hosts", hm.group(1))
+
+    for m in ARTIFACT_RX.finditer(text):
+        ev = m.group("event_id")
+        if ev:
+            add("event_ids", ev)
+            continue
+        pd = m.group("problem_desc")
+        if pd:
+            add("problem_descriptions", pd.strip(), limit=5)
+            # The description branch consumes the rest of the line, so URLs
+            # and Event Ids inside it never reach their own branches; re-scan
+            # the captured span through the same collectors.
+            for um in KEY_LINK_RX.finditer(pd):
+                add_url(um.group(0))
+            for em in EVENT_ID_RX.finditer(pd):
+                add("event_ids", em.group(1))
+            continue
+        add_url(m.group("url") or "")
+
+    for m in DROPBOX_LOGIN_RX.finditer(text):
+        add("dropbox_logins", m.group(1).strip())
+
+    return out
+
+
 def find_host_name(text: str) -> str:
     """Try to extract a hostname/system name from the Communications text.
 
@@ -1078,8 +1606,10 @@ def find_host_name(text: str) -> str:
     if not text:
         return ""
 
-    m = re.search(r"(?is)(System\s*Name/Host\s*Name|Host\s*Name|System\s*Name)\s*:\s*([^\r\n]{0,200})", text)
-    if m:
+    # Walk every labelled candidate before giving up on the primary branch:
+    # a first "dirty" match (stop value / no token) no longer forces the
+    # line-based fallback scan when a later match carries the real host.
+    for m in HOST_SYS_RX.finditer(text):
         val = (m.group(2) or "").strip()
         for cut in ["You will", "You can", "You may", "You should", "You will receive", "You can view"]:
             if cut in val:
@@ -1089,18 +1619,17 @@ def find_host_name(text: str) -> str:
             host = tm.group(0).strip()
             # Sometimes the UI glues words right after the hostname (e.g. "src123YouWill...").
             # If the token ends with letters after the last digit, trim it back to the last digit.
-            m2 = re.match(r"^([A-Za-z0-9._-]*\d)[A-Za-z]{2,}$", host)
+            m2 = HOST_TRIM_RX.match(host)
             if m2:
                 host = m2.group(1)
             if host.lower() not in STOP_HOST_VALUES:
                 return host
 
-    # Fallback: line-based
-    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
-        mm = HOST_LINE_RX.match(line.strip())
-        if not mm:
+    # Fallback: line-based (single fused scan over the whole text)
+    for mm in META_LINE_RX.finditer(text):
+        if not mm.group("host_label"):
             continue
-        val = (mm.group(2) or "").strip()
+        val = (mm.group("val") or "").strip()
         if not val:
             continue
         for cut in ["You will", "You can", "You may", "You should"]:
@@ -1123,11 +1652,11 @@ def find_salutation_name(text: str) -> str:
 def extract_address_block(text: str) -> dict:
     if not text:
         return {}
-    lines = [l.strip() for l in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    lines = [l.strip() for l in normalize_newlines(text).split("\n")]
 
     def is_marker(line: str) -> bool:
         low = line.lower().rstrip(":")
-        return any(low == m.lower().rstrip(":") for m in ADDR_MARKERS) or any(low.startswith(m.lower()) for m in ADDR_MARKERS)
+        return low in _ADDR_MARKERS_EQ or low.startswith(_ADDR_MARKERS_PFX)
 
     for i, line in enumerate(lines):
         if is_marker(line):
@@ -1140,10 +1669,10 @@ def extract_address_block(text: str) -> dict:
                 stop_low = lines[j].lower()
                 if stop_low.startswith(("thank you", "sincerely", "ref:")):
                     break
-                m = ADDR_KV_RX.match(lines[j])
-                if m:
-                    key = m.group(1).strip().lower()
-                    val = m.group(2).strip()
+                m = META_LINE_RX.match(lines[j])
+                if m and m.group("addr_label") and m.group("val"):
+                    key = m.group("addr_label").strip().lower()
+                    val = m.group("val").strip()
                     if key in ("zip", "zipcode"):
                         key = "postal_code"
                     if key in ("postal code", "postcode"):
@@ -1166,24 +1695,25 @@ def extract_onsite_from_comms(text: str) -> Dict[str, str]:
     if not text:
         return out
 
-    low = text.lower()
-    if ("onsite" not in low) and ("on the way to your location" not in low) and ("is on the way to your location" not in low):
+    # Single-shot probe: avoids materializing text.lower() (a full copy of
+    # the comms body) in the common case where nothing onsite is mentioned.
+    if not ONSITE_PROBE_RX.search(text):
         return out
 
     out["onsite_detected"] = "1"
 
     # Example: "Jan Vanroy is on the way to your location..."
-    m = re.search(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\s+is\s+on\s+the\s+way\s+to\s+your\s+location\b", text)
+    m = ONSITE_ENGINEER_RX.search(text)
     if m:
         out["onsite_engineer"] = m.group(1).strip()
 
     # Example: "assist you with your onsite task (5401149164-541)."
-    m = re.search(r"\bonsite\s+task\s*\(\s*([0-9]{7,12}-[0-9]{1,4})\s*\)", text, re.I)
+    m = ONSITE_TASK_REF_RX.search(text)
     if m:
         out["onsite_task_ref"] = m.group(1).strip()
 
     # Some templates contain a numeric task id (different from case number)
-    m = re.search(r"\bTask\s*ID\s*[:\s]+([0-9]{4,})\b", text, re.I)
+    m = ONSITE_TASK_ID_COLON_RX.search(text)
     if m:
         out["onsite_task_id"] = m.group(1).strip()
 
@@ -1196,15 +1726,15 @@ def extract_onsite_kv(text: str) -> Dict[str, str]:
     if not text:
         return out
 
-    m = re.search(r"\bTask\s*ID\s+([0-9]{4,})\b", text, re.I)
+    m = ONSITE_TASK_ID_RX.search(text)
     if m:
         out["onsite_task_id"] = m.group(1).strip()
 
-    m = re.search(r"\bScheduling\s+Status\s+([A-Za-z][A-Za-z \-]{0,40})\b", text, re.I)
+    m = ONSITE_SCHED_STATUS_RX.search(text)
     if m:
         out["onsite_scheduling_status"] = m.group(1).strip()
 
-    m = re.search(r"\bLatest\s+Service\s+Start\s+([A-Za-z]{3}\s+\d{1,2},\s+\d{4},?\s+\d{1,2}:\d{2}\s+[AP]M)\b", text)
+    m = ONSITE_LATEST_SVC_RX.search(text)
     if m:
         out["onsite_latest_service_start"] = m.group(1).strip()
 
@@ -1221,7 +1751,7 @@ def try_extract_onsite_tab_text(page) -> str:
     """
     markers = ["Task ID", "Scheduling Status", "Latest Service Start", "Onsite Service Request"]
     try:
-        tab = page.get_by_role("tab", name=re.compile(r"Onsite\s+Service", re.I)).first
+        tab = page.get_by_role("tab", name=ONSITE_TAB_NAME_RX).first
         if tab.count() == 0:
             return ""
 
@@ -1243,11 +1773,8 @@ def try_extract_onsite_tab_text(page) -> str:
             except Exception:
                 return ""
 
-        # Give the UI a moment to render the tabpanel content
-        try:
-            page.wait_for_timeout(900)
-        except Exception:
-            pass
+        # Wait for the tabpanel content instead of a fixed render delay.
+        wait_for_panel_text(page, markers, timeout_ms=5000, fallback_ms=300)
 
         # Preferred: resolve the tabpanel via aria-controls (more deterministic than scanning all panels)
         try:
@@ -1269,22 +1796,9 @@ def try_extract_onsite_tab_text(page) -> str:
                 pass
 
         # Fallback: scan visible tabpanels and pick the one with the expected markers
-        try:
-            panels = page.get_by_role("tabpanel")
-            count = panels.count()
-        except Exception:
-            count = 0
-
-        for i in range(min(count, 20)):
-            p = panels.nth(i)
-            try:
-                if not p.is_visible():
-                    continue
-                t = p.inner_text(timeout=8000)
-                if any(m in t for m in markers):
-                    return t
-            except Exception:
-                continue
+        for t in visible_tabpanel_texts(page, 20):
+            if any(m in t for m in markers):
+                return t
 
         # Last resort: search the page main content (if the UI inlined the tab content)
         try:
@@ -1297,9 +1811,52 @@ def try_extract_onsite_tab_text(page) -> str:
 
 
 
+# Status phrases that imply a pending customer action, matched in one scan.
+STATUS_ACTION_RX = re.compile(r"(complete action plan|approve (?:case )?closure)", re.I)
+_STATUS_ACTION_MAP = {
+    "complete action plan": "Complete action plan",
+    "approve case closure": "Approve case closure",
+    "approve closure": "Approve case closure",
+}
+
+# Keyword triage for infer_requested_actions: one alternation scan over the
+# lowered comms collects every trigger phrase at once, instead of ~12
+# separate `in` scans over the full body. Longest-first ordering keeps
+# phrases with shared prefixes ("onsite service"/"onsite task") exact.
+ACTION_KEYWORDS = (
+    "log file request", "require some log files", "provide these logs",
+    "active health system", "ahs log", "reply all", "ilo storage",
+    "photo of the physical drive", "led", "onsite service", "onsite task",
+    "on the way to your location", "dispatch", "engineer", "in progress",
+)
+ACTION_KEYWORDS_RX = re.compile(
+    "|".join(re.escape(k) for k in sorted(ACTION_KEYWORDS, key=len, reverse=True))
+)
+
+
+# Triage results keyed by (status, digest of the comms head). A retry or a
+# refresh that resurfaces identical comms skips the whole keyword scan; the
+# digest keeps the cache from pinning full comms bodies in memory.
+_INFER_CACHE: Dict[Tuple[str, str], Tuple[str, str, Tuple[str, ...]]] = {}
+_INFER_CACHE_MAX = 512
+
+
 def infer_requested_actions(status: str, comms: str):
     st = (status or "").lower()
     c = (comms or "").lower()
+    key = (st, hashlib.blake2b(c[:4096].encode("utf-8", "ignore"), digest_size=8).hexdigest())
+    cached = _INFER_CACHE.get(key)
+    if cached is not None:
+        return cached[0], cached[1], list(cached[2])
+    category, summary, actions = _infer_requested_actions(st, c)
+    if len(_INFER_CACHE) >= _INFER_CACHE_MAX:
+        _INFER_CACHE.clear()
+    _INFER_CACHE[key] = (category, summary, tuple(actions))
+    return category, summary, actions
+
+
+def _infer_requested_actions(st: str, c: str):
+    hits = set(ACTION_KEYWORDS_RX.findall(c))
 
     actions = []
     category = "UNKNOWN"
@@ -1316,17 +1873,20 @@ def infer_requested_actions(status: str, comms: str):
         summary = "HPE wacht op completion van het action plan."
         actions.append("Action plan afronden en bevestigen in HPE portal (Complete action plan).")
 
-    if ("log file request" in c) or ("require some log files" in c) or ("provide these logs" in c) or ("active health system" in c) or ("ahs log" in c):
+    if hits & {"log file request", "require some log files", "provide these logs", "active health system", "ahs log"}:
         category = "LOG_REQUEST"
         summary = "HPE vraagt logbestanden (AHS) + eventueel iLO/disk info om diagnose verder te zetten."
         actions.append("AHS / Active Health System log genereren en uploaden naar HPE dropbox (HPRC).")
-        if "reply all" in c:
+        if "reply all" in hits:
             actions.append("Na upload: Reply All op HPE mail/thread om te bevestigen dat logs klaarstaan.")
-        if ("ilo storage" in c) or ("photo of the physical drive" in c) or ("led" in c):
+        if hits & {"ilo storage", "photo of the physical drive", "led"}:
             actions.append("Screenshot iLO Storage tab of foto fysieke disk/LEDs toevoegen.")
 
     # Onsite service / dispatch updates (often for In Progress cases)
-    if not actions and (("onsite service" in c) or ("onsite task" in c) or ("on the way to your location" in c) or ("is on the way to your location" in c) or ("dispatch" in c and "engineer" in c)):
+    if not actions and (
+        hits & {"onsite service", "onsite task", "on the way to your location"}
+        or ("dispatch" in hits and "engineer" in hits)
+    ):
         category = "ONSITE_SERVICE"
         summary = "HPE onsite interventie/dispatch loopt (technieker gepland/onderweg)."
         actions.append("Check Onsite Service tab voor planning/status (task ID, scheduling status, latest service start).")
@@ -1334,7 +1894,7 @@ def infer_requested_actions(status: str, comms: str):
         return category, summary, actions
 
     # General in-progress cases where HPE is working and no explicit customer action is detected
-    if not actions and ("in progress" in st or "in progress" in c):
+    if not actions and ("in progress" in st or "in progress" in hits):
         category = "IN_PROGRESS"
         summary = "Case is in progress bij HPE (lopende opvolging, geen duidelijke customer action gedetecteerd)."
         actions.append("Opvolgen: check laatste HPE update; reageer enkel als HPE iets vraagt.")
@@ -1352,6 +1912,24 @@ def infer_requested_actions(status: str, comms: str):
 
     return category, summary, actions
 
+# Runs the case-number regex inside the browser: one IPC round-trip per
+# scroll round instead of a locator query + per-element text transfer, and
+# no Python-side regex over the returned strings.
+_CASES_IN_PAGE_JS = """(args) => {
+  const rx = new RegExp(args.src, 'g');
+  const seen = new Set(args.existing);
+  const out = [];
+  const root = document.body || document.documentElement;
+  const t = root ? (root.innerText || '') : '';
+  let m;
+  while ((m = rx.exec(t))) {
+    const cn = m[1];
+    if (cn && !seen.has(cn)) { seen.add(cn); out.push(cn); }
+  }
+  return out;
+}"""
+
+
 def collect_case_numbers(page, cfg, max_cases: int):
     # IMPORTANT: use the *largest* visible candidate, not the first.
     # This avoids scoping to a single status section like "Awaiting Customer Action".
@@ -1392,24 +1970,44 @@ def collect_case_numbers(page, cfg, max_cases: int):
     except Exception:
         scroll_handle = None
 
+    stable_rounds = 0
     for _ in range(15):
+        # Match page-wide (not just the chosen scope) so cases outside the
+        # container are still picked up; the scope only matters for scrolling.
         try:
-            # Use page-wide locator to avoid missing cases outside the chosen scope.
-            # Scope is still helpful for scrolling, not for matching.
-            loc = page.locator("text=/\\bCase\\s+\\d{7,12}\\b/")
-            texts = loc.all_text_contents()
+            new_cns = page.evaluate(_CASES_IN_PAGE_JS, {"src": rx.pattern, "existing": list(seen)})
         except Exception:
-            texts = []
+            new_cns = None
 
-        for t in texts:
-            m = rx.search(t)
-            if m:
-                cn = m.group(1)
-                if cn not in seen:
-                    seen.add(cn)
-                    found.append(cn)
-                    if max_cases > 0 and len(found) >= max_cases:
-                        return found
+        if new_cns is None:
+            # Fallback: locator scan + Python-side regex.
+            try:
+                texts = page.locator(_CASE_NUMBER_SELECTOR).all_text_contents()
+            except Exception:
+                texts = []
+            new_cns = []
+            for t in texts:
+                m = rx.search(t)
+                if m:
+                    new_cns.append(m.group(1))
+
+        added = 0
+        for cn in new_cns:
+            if cn and cn not in seen:
+                seen.add(cn)
+                found.append(cn)
+                added += 1
+                if max_cases > 0 and len(found) >= max_cases:
+                    return found
+
+        # Early exit: once the list has settled (two scroll rounds without a
+        # new case) further rounds only burn the 800 ms waits.
+        if added == 0 and found:
+            stable_rounds += 1
+            if stable_rounds >= 2:
+                break
+        else:
+            stable_rounds = 0
 
         try:
             if scroll_handle:
@@ -1449,7 +2047,9 @@ def open_case_by_number(page, cfg, case_no: str):
             search.fill("")
             search.fill(case_no)
             page.keyboard.press("Enter")
-            page.wait_for_timeout(600)
+            # The target.wait_for below is the real synchronization point;
+            # keep only a short animation backstop here.
+            page.wait_for_timeout(100)
         except Exception:
             pass
 
@@ -1465,6 +2065,38 @@ def open_case_by_number(page, cfg, case_no: str):
     except PWTimeoutError:
         pass
 
+_TAB_LABELS_JS = """() => Array.from(document.querySelectorAll("[role='tab']")).map(t => (t.textContent || '').trim())"""
+
+_PANEL_HAS_TEXT_JS = """(needles) => {
+  for (const p of document.querySelectorAll("[role='tabpanel'], main")) {
+    if (p.offsetParent === null) continue;
+    const t = p.innerText || '';
+    for (const n of needles) if (t.includes(n)) return true;
+  }
+  return false;
+}"""
+
+
+def wait_for_panel_text(page, needles, timeout_ms: int = 8000, fallback_ms: int = 500) -> bool:
+    """Wait until a visible panel contains one of the marker strings.
+
+    Event-based replacement for the fixed post-click sleeps: returns as soon
+    as the tab content rendered instead of always burning the full delay.
+    Falls back to a short fixed sleep when the predicate can't run.
+    """
+    if needles:
+        try:
+            page.wait_for_function(_PANEL_HAS_TEXT_JS, arg=list(needles), timeout=timeout_ms, polling=100)
+            return True
+        except Exception:
+            pass
+    try:
+        page.wait_for_timeout(fallback_ms)
+    except Exception:
+        pass
+    return False
+
+
 def click_tab(page, cfg, tab_key: str):
     sels = cfg.get(tab_key, [])
     for sel in sels:
@@ -1472,69 +2104,168 @@ def click_tab(page, cfg, tab_key: str):
             loc = page.locator(sel).first
             if loc.count() > 0:
                 loc.click(timeout=8000)
-                page.wait_for_timeout(400)
+                # Callers follow up with wait_for_panel_text; only a short
+                # animation backstop is needed here.
+                page.wait_for_timeout(100)
                 return True
         except Exception:
             continue
     return False
 
-def extract_details_text(page):
+_TABPANEL_TEXTS_JS = """(limit) => {
+  const out = [];
+  for (const p of document.querySelectorAll("[role='tabpanel']")) {
+    if (out.length >= limit) break;
+    if (p.offsetParent === null) continue;
+    out.push(p.innerText || '');
+  }
+  return out;
+}"""
+
+
+def visible_tabpanel_texts(page, limit: int) -> List[str]:
+    """Texts of the visible tabpanels, fetched in one evaluate.
+
+    One IPC round-trip instead of count() + per-panel is_visible() +
+    inner_text() calls; falls back to the locator loop if evaluate fails.
+    """
+    try:
+        texts = page.evaluate(_TABPANEL_TEXTS_JS, limit)
+        if isinstance(texts, list):
+            return texts
+    except Exception:
+        pass
     panels = page.get_by_role("tabpanel")
     try:
         count = panels.count()
     except Exception:
         count = 0
-
-    for i in range(min(count, 8)):
+    texts = []
+    for i in range(min(count, limit)):
         p = panels.nth(i)
         try:
             if p.is_visible():
-                txt = p.inner_text(timeout=5000)
-                if "Serial Number" in txt and "Status" in txt:
-                    return txt
+                texts.append(p.inner_text(timeout=8000))
         except Exception:
             continue
+    return texts
+
+
+def extract_details_text(page):
+    for txt in visible_tabpanel_texts(page, 8):
+        if "Serial Number" in txt and "Status" in txt:
+            return txt
 
     try:
         return page.locator("main").inner_text(timeout=5000)
     except Exception:
         return page.content()
 
+# Clicks the first visible match of any expand-all selector in one in-page
+# pass. Playwright-only selector syntax (':has-text()' etc.) makes
+# querySelectorAll throw; those selectors are skipped here and handled by
+# the locator fallback below.
+_EXPAND_ALL_JS = """(sels) => {
+  for (const sel of sels) {
+    let nodes;
+    try { nodes = document.querySelectorAll(sel); } catch (e) { continue; }
+    for (const el of nodes) {
+      if (el.offsetParent === null) continue;
+      el.click();
+      return true;
+    }
+  }
+  return false;
+}"""
+
+
 def click_expand_all_comms(page, cfg):
-    for sel in cfg.get("expand_all_any", []):
+    sels = cfg.get("expand_all_any", [])
+    if not sels:
+        return False
+    try:
+        clicked = page.evaluate(_EXPAND_ALL_JS, sels)
+    except Exception:
+        clicked = False
+    if clicked:
+        _settle_after_expand(page)
+        return True
+    return _click_expand_all_via_locators(page, sels)
+
+
+def _click_expand_all_via_locators(page, sels):
+    for sel in sels:
         try:
             loc = page.locator(sel).first
             if loc.count() == 0:
                 continue
             loc.click(timeout=8000)
-            page.wait_for_timeout(500)
+            _settle_after_expand(page)
             return True
         except Exception:
             continue
     return False
 
 
+def _settle_after_expand(page):
+    try:
+        page.wait_for_load_state("networkidle", timeout=3000)
+    except Exception:
+        page.wait_for_timeout(300)
+
+
 
 def ensure_expand_all_comms(page, cfg) -> bool:
     """Try to ensure 'Expand all communications' is enabled (checkbox/toggle)."""
     try:
-        cb = page.get_by_role("checkbox", name=re.compile(r"Expand all communications", re.I))
+        cb = page.get_by_role("checkbox", name=EXPAND_ALL_NAME_RX)
         if cb.count():
             try:
                 if not cb.first.is_checked():
                     cb.first.set_checked(True, timeout=8000)
-                    page.wait_for_timeout(500)
+                    _settle_after_expand(page)
             except Exception:
                 cb.first.click(timeout=8000)
-                page.wait_for_timeout(500)
+                _settle_after_expand(page)
             return True
     except Exception:
         pass
     return click_expand_all_comms(page, cfg)
 
 
+# Clicks every visible 'Read more' control in one in-page pass: one IPC
+# round-trip per round instead of count() + is_visible() + click() per item.
+_READ_MORE_JS = """() => {
+  const rx = /read\\s*more/i;
+  let clicked = 0;
+  for (const el of document.querySelectorAll('a, button, [role=button]')) {
+    if (el.offsetParent === null) continue;
+    const t = (el.textContent || '').trim();
+    if (t.length <= 40 && rx.test(t)) { el.click(); clicked++; }
+  }
+  return clicked;
+}"""
+
+
 def click_all_read_more(page, cfg, max_rounds: int = 10):
     """Click all visible 'Read more' links/buttons inside Communications."""
+    for rnd in range(max_rounds):
+        try:
+            clicked = page.evaluate(_READ_MORE_JS)
+        except Exception:
+            # Evaluate unavailable (e.g. CSP); fall back to locator clicks.
+            return _click_all_read_more_via_locators(page, cfg, max_rounds)
+        if not clicked:
+            if rnd == 0 and cfg.get("read_more_any"):
+                # The in-page scan only knows /read more/; a deployment that
+                # configured different link text still gets its selectors.
+                return _click_all_read_more_via_locators(page, cfg, max_rounds)
+            break
+        # Let the SPA render the expanded content before re-scanning.
+        page.wait_for_timeout(250)
+
+
+def _click_all_read_more_via_locators(page, cfg, max_rounds: int = 10):
     selectors = cfg.get("read_more_any") or [
         "a:has-text('Read more')",
         "button:has-text('Read more')",
@@ -1563,24 +2294,11 @@ def click_all_read_more(page, cfg, max_rounds: int = 10):
             break
 
 def extract_comms_text(page, cfg):
-    panels = page.get_by_role("tabpanel")
-    try:
-        count = panels.count()
-    except Exception:
-        count = 0
-
     hints = cfg.get("comms_panel_hint_any", [])
 
-    for i in range(min(count, 10)):
-        p = panels.nth(i)
-        try:
-            if not p.is_visible():
-                continue
-            txt = p.inner_text(timeout=8000)
-            if any(h in txt for h in hints):
-                return txt
-        except Exception:
-            continue
+    for txt in visible_tabpanel_texts(page, 10):
+        if any(h in txt for h in hints):
+            return txt
 
     try:
         return page.locator("main").inner_text(timeout=8000)
@@ -1596,6 +2314,370 @@ def write_alarm(outdir: Path, alarm_file: str, msg: str, alarm_cmd: str | None):
         except Exception:
             pass
 
+# CSV column order for the overview export (JSON rows carry extra keys the
+# CSV writer ignores).
+FIELDS_OUT = [
+    "case_no","serial","host_name","contact_name",
+    "addr_street","addr_city","addr_state","addr_postal_code","addr_country",
+    "status","severity","product","product_no","group","action_plan",
+    "hpe_last_update","hpe_last_subject","hpe_request_category","hpe_request_summary",
+    "hpe_requested_actions","hpe_key_links",
+    "event_ids","problem_descriptions","ahs_links","dropbox_hosts","dropbox_logins",
+    "comms_file","generated_at"
+]
+
+
+# Pre-sized row template: copying it avoids re-growing the dict hash table
+# key-by-key for every case. The onsite_* extras only show up in the JSON
+# export; the CSV writer ignores them.
+ROW_TEMPLATE = dict.fromkeys(FIELDS_OUT + [
+    "onsite_detected", "onsite_task_ref", "onsite_task_id",
+    "onsite_scheduling_status", "onsite_latest_service_start", "onsite_engineer",
+], "")
+
+
+# One timestamp per run: every row shares the logical "generated at" moment,
+# and per-case datetime.now() calls disappear. main() sets this; library
+# callers that invoke process_case directly fall back to the live clock.
+_RUN_GENERATED_AT = ""
+
+
+def _join(xs) -> str:
+    """' | '-join that skips the call (and allocation) for empty lists."""
+    return " | ".join(xs) if xs else ""
+
+
+def process_case(page, cfg, outdir: Path, case_no: str) -> Dict[str, Any]:
+    """Open one case and extract its overview row (details + comms + onsite).
+
+    Shared by the sequential loop and the worker pool; raises on failure so
+    the caller can record the error and dump debug artifacts.
+    """
+    open_case_by_number(page, cfg, case_no)
+
+    click_tab(page, cfg, "tab_details_any")
+    wait_for_panel_text(page, ["Serial Number", "Status"], fallback_ms=500)
+    details_text = redact_sensitive(extract_details_text(page))
+    fields = parse_line_pairs(details_text)
+    serial = fields.get("serial", "") or ""
+
+    click_tab(page, cfg, "tab_communications_any")
+    wait_for_panel_text(page, cfg.get("comms_panel_hint_any", []), fallback_ms=700)
+    click_expand_all_comms(page, cfg)
+    # Expanded blocks render client-side; wait for the network to settle
+    # rather than a fixed 900 ms.
+    try:
+        page.wait_for_load_state("networkidle", timeout=3000)
+    except Exception:
+        page.wait_for_timeout(300)
+    # Normalize newlines once here; every downstream extractor
+    # (split_messages, extract_address_block, ...) then sees clean text and
+    # its own normalization degenerates to a no-op scan.
+    comms_text = normalize_newlines(redact_sensitive(extract_comms_text(page, cfg)))
+    # Fallback: if Overview/Details fields are missing, parse from Communications header.
+    # Skip the second parse entirely when Details already filled every field.
+    if any(not fields.get(k) for k in FIELD_LABELS):
+        fields_from_comms = parse_line_pairs(comms_text)
+        for k, v in fields_from_comms.items():
+            if v and not fields.get(k):
+                fields[k] = v
+
+    comms_file = outdir / "cases" / f"{case_no}_communications_redacted.txt"
+    save_text(comms_file, comms_text)
+
+    blocks = split_messages(comms_text)
+    last = pick_last_hpe_message(blocks)
+    last_ts, last_block = (last if last else ("", ""))
+
+    hpe_subject = extract_subject(last_block)
+    host = find_host_name(comms_text)
+    contact_name = find_salutation_name(comms_text)
+    addr = extract_address_block(comms_text)
+
+    # Extra structured info from communications (handy for dashboards)
+    artifacts = extract_all_comms_artifacts(comms_text)
+    event_ids = artifacts["event_ids"]
+    problem_descs = artifacts["problem_descriptions"]
+    ahs_links = artifacts["ahs_links"]
+    drop_hosts, drop_logins = artifacts["dropbox_hosts"], artifacts["dropbox_logins"]
+
+    category, summary, actions = infer_requested_actions(fields.get("status",""), comms_text)
+
+    # If this looks like an onsite service case, try to enrich with a few structured fields.
+    # This ONLY adds extra JSON keys; CSV stays unchanged (extras are ignored by the writer).
+    onsite_info = extract_onsite_from_comms(comms_text)
+    onsite_hint = (
+        ("onsite" in (hpe_subject or "").lower())
+        or ("onsite_detected" in onsite_info)
+        or (category == "ONSITE_SERVICE")
+    )
+
+    # If comms parsing didn't reveal onsite signals, do a cheap UI hint check:
+    # (Some 'In Progress' cases have an Onsite Service tab but short/empty comms rendering.)
+    if not onsite_hint:
+        try:
+            # One evaluate over the tab labels is cheaper than a role query
+            # with accessible-name matching.
+            labels = page.evaluate(_TAB_LABELS_JS)
+            onsite_tab_present = any(ONSITE_TAB_NAME_RX.search(t or "") for t in labels)
+        except Exception:
+            try:
+                onsite_tab_present = page.get_by_role("tab", name=ONSITE_TAB_NAME_RX).count() > 0
+            except Exception:
+                onsite_tab_present = False
+        if onsite_tab_present:
+            onsite_hint = True
+            onsite_info.setdefault("onsite_detected", "1")
+
+    # Opening the Onsite Service tab costs 1-2 s of clicks and waits; skip it
+    # when comms parsing already filled every structured onsite field.
+    if onsite_hint and not all(
+        onsite_info.get(k)
+        for k in (
+            "onsite_task_id",
+            "onsite_task_ref",
+            "onsite_scheduling_status",
+            "onsite_latest_service_start",
+            "onsite_engineer",
+        )
+    ):
+        try:
+            onsite_tab_text = try_extract_onsite_tab_text(page)
+            onsite_info.update(extract_onsite_kv(onsite_tab_text))
+        except Exception:
+            pass
+
+    # If onsite fields are present, prefer ONSITE_SERVICE over generic IN_PROGRESS
+    if category == "IN_PROGRESS" and any(
+        onsite_info.get(k)
+        for k in (
+            "onsite_task_id",
+            "onsite_task_ref",
+            "onsite_scheduling_status",
+            "onsite_latest_service_start",
+            "onsite_engineer",
+        )
+    ):
+        category = "ONSITE_SERVICE"
+        summary = "HPE onsite interventie/dispatch loopt (technieker gepland/onderweg)."
+        actions = [
+            "Check Onsite Service tab voor planning/status (task ID, scheduling status, latest service start).",
+            "Zorg dat toegang/site contact klopt; bereid interventie/onderdelen/remote access voor.",
+        ]
+
+    key_links = extract_key_links(last_block or comms_text, limit=8)
+
+    action_plan = fields.get("action_plan", "")
+    if not action_plan and fields.get("status"):
+        m = STATUS_ACTION_RX.search(fields["status"])
+        if m:
+            action_plan = _STATUS_ACTION_MAP[m.group(1).lower()]
+    row = ROW_TEMPLATE.copy()
+    row["case_no"] = case_no
+    row["serial"] = serial
+    row["host_name"] = host
+    row["contact_name"] = contact_name
+    row["addr_street"] = addr.get("street","")
+    row["addr_city"] = addr.get("city","")
+    row["addr_state"] = addr.get("state","")
+    row["addr_postal_code"] = addr.get("postal_code","")
+    row["addr_country"] = addr.get("country","")
+    row["status"] = fields.get("status","")
+    row["severity"] = fields.get("severity","")
+    row["product"] = fields.get("product","")
+    row["product_no"] = fields.get("product_no","")
+    row["group"] = fields.get("group","")
+    row["action_plan"] = action_plan
+    row["hpe_last_update"] = last_ts
+    row["hpe_last_subject"] = hpe_subject
+    row["hpe_request_category"] = category
+    row["hpe_request_summary"] = summary
+    row["hpe_requested_actions"] = _join(actions)
+    row["hpe_key_links"] = _join(key_links)
+    row["event_ids"] = _join(event_ids)
+    row["problem_descriptions"] = _join(problem_descs)
+    row["ahs_links"] = _join(ahs_links)
+    row["dropbox_hosts"] = _join(drop_hosts)
+    row["dropbox_logins"] = _join(drop_logins)
+    # Optional: onsite service enrichment (only in JSON; CSV ignores extras)
+    row["onsite_detected"] = onsite_info.get("onsite_detected","")
+    row["onsite_task_ref"] = onsite_info.get("onsite_task_ref","")
+    row["onsite_task_id"] = onsite_info.get("onsite_task_id","")
+    row["onsite_scheduling_status"] = onsite_info.get("onsite_scheduling_status","")
+    row["onsite_latest_service_start"] = onsite_info.get("onsite_latest_service_start","")
+    row["onsite_engineer"] = onsite_info.get("onsite_engineer","")
+    row["comms_file"] = str(comms_file)
+    row["generated_at"] = _RUN_GENERATED_AT or utc_now_iso()
+    return row
+
+
+# Full-page screenshots force Chromium to resize and re-render the whole
+# document; viewport-only is the default and --deep-debug opts back in.
+_DEEP_DEBUG = False
+
+# Small pool for debug-artifact disk writes, so an error case doesn't stall
+# the next case on I/O. Daemon-style: writes are best-effort anyway.
+_DEBUG_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="debugio")
+
+
+def _save_bytes_quiet(path: Path, data: bytes) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    except Exception:
+        pass
+
+
+def _save_text_quiet(path: Path, text: str) -> None:
+    try:
+        save_text(path, text)
+    except Exception:
+        pass
+
+
+def dump_case_debug(page, outdir: Path, case_no: str) -> None:
+    """Best-effort screenshot + HTML dump for a failed case.
+
+    Captures run on the calling thread (sync-API pages are thread-affine);
+    only the disk writes are handed to the background pool.
+    """
+    try:
+        shot = page.screenshot(full_page=_DEEP_DEBUG)
+    except Exception:
+        shot = None
+    # Serializing the full DOM can take hundreds of ms on multi-MB comms
+    # pages; outside --deep-debug, scope the dump to <main>.
+    html = None
+    if _DEEP_DEBUG:
+        try:
+            html = page.content()
+        except Exception:
+            html = None
+    if html is None:
+        try:
+            html = page.locator("main").inner_html(timeout=3000)
+        except Exception:
+            html = None
+    if shot is not None:
+        _DEBUG_POOL.submit(_save_bytes_quiet, outdir / "debug" / f"{case_no}_error.png", shot)
+    if html is not None:
+        _DEBUG_POOL.submit(_save_text_quiet, outdir / "debug" / f"{case_no}_error.html", html)
+
+
+def _case_worker(worker_id, cfg, state_path, cases_url, outdir, case_q, total,
+                 results, errors, lock, headless, on_row=None, on_error=None):
+    """Worker for run_cases_parallel.
+
+    Sync-API Playwright objects are thread-affine, so each worker starts its
+    own Playwright instance/browser and builds a context from the shared
+    storage state instead of sharing the main browser across threads.
+    """
+    p = None
+    browser = None
+    try:
+        p = sync_playwright().start()
+        browser = p.chromium.launch(headless=headless)
+        if state_path.exists():
+            context = browser.new_context(storage_state=str(state_path))
+        else:
+            context = browser.new_context()
+        page = context.new_page()
+        try:
+            page.set_viewport_size({'width': 1600, 'height': 1000})
+        except Exception:
+            pass
+        goto_cases_with_retry(page, cfg, cases_url, timeout_ms=60000)
+        dismiss_contract_banner(page, cfg)
+        dismiss_cookie_banner(page, cfg)
+        ensure_ready(page, cfg, timeout_ms=45000)
+        while True:
+            try:
+                idx, case_no = case_q.get_nowait()
+            except queue.Empty:
+                break
+            # Outside the per-case try, like the sequential paths: hitting the
+            # global deadline must stop the worker, not be booked as one more
+            # per-case error (plus a debug dump) for every queued case.
+            _check_deadline()
+            print(f"\n=== [{idx}/{total}] Case {case_no} (worker {worker_id}) ===")
+            try:
+                row = process_case(page, cfg, outdir, case_no)
+                with lock:
+                    results.append(row)
+                if on_row:
+                    on_row(row)
+                print(f"OK: {case_no} | {row['serial']} | {row['status']}")
+            except Exception as e:
+                rec = {"case_no": case_no, "error": str(e)}
+                with lock:
+                    errors.append(rec)
+                if on_error:
+                    on_error(rec)
+                print(f"ERROR {case_no}: {e}")
+                dump_case_debug(page, outdir, case_no)
+    except Exception as e:
+        if str(e) == 'GLOBAL_TIMEOUT':
+            # The fallback drain / main() re-checks the deadline and aborts.
+            print(f"Worker {worker_id}: GLOBAL_TIMEOUT reached; stopping.")
+        else:
+            # Startup failure: leave the queue to the other workers / the
+            # sequential drain in run_cases_parallel.
+            print(f"WARN: case worker {worker_id} failed: {e}")
+    finally:
+        try:
+            if browser:
+                browser.close()
+        except Exception:
+            pass
+        try:
+            if p:
+                p.stop()
+        except Exception:
+            pass
+
+
+def run_cases_parallel(cfg, state_path, cases_url, outdir, case_nos, results,
+                       errors, headless, main_page, workers, on_row=None, on_error=None):
+    """Process cases with a pool of worker browsers.
+
+    Per-case work is dominated by navigation/DOM waits, so overlapping cases
+    across contexts gives near-linear speedup until the portal rate-limits.
+    Cases still queued when the pool exits (e.g. no worker could start) are
+    drained sequentially on the main page.
+    """
+    case_q = queue.Queue()
+    for idx, case_no in enumerate(case_nos, start=1):
+        case_q.put((idx, case_no))
+    lock = threading.Lock()
+    total = len(case_nos)
+    print(f"Processing {total} cases with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for wid in range(workers):
+            pool.submit(_case_worker, wid + 1, cfg, state_path, cases_url,
+                        outdir, case_q, total, results, errors, lock, headless,
+                        on_row, on_error)
+    while True:
+        try:
+            idx, case_no = case_q.get_nowait()
+        except queue.Empty:
+            break
+        print(f"\n=== [{idx}/{total}] Case {case_no} (fallback) ===")
+        _check_deadline()
+        try:
+            row = process_case(main_page, cfg, outdir, case_no)
+            results.append(row)
+            if on_row:
+                on_row(row)
+            print(f"OK: {case_no} | {row['serial']} | {row['status']}")
+        except Exception as e:
+            rec = {"case_no": case_no, "error": str(e)}
+            errors.append(rec)
+            if on_error:
+                on_error(rec)
+            print(f"ERROR {case_no}: {e}")
+            dump_case_debug(main_page, outdir, case_no)
+
+
 def main():
     ap = argparse.ArgumentParser(description="HPE Support Center - Cases overview + communications extraction (standalone)")
     ap.add_argument("--state", default="hpe_state.json", help="Playwright storage state JSON (logged-in session)")
@@ -1607,6 +2689,8 @@ def main():
     ap.add_argument("--alarm-file", default="ALERT_SESSION_EXPIRED.txt", help="Alarm file to write on session timeout")
     ap.add_argument("--alarm-cmd", default=None, help="Optional command to execute when session expired (e.g. PowerShell mail)")
     ap.add_argument("--timeout", type=int, default=0, help="Max runtime in seconds (0=unlimited)")
+    ap.add_argument("--workers", type=int, default=1, help="Parallel browser workers for per-case processing (1=sequential)")
+    ap.add_argument("--deep-debug", action="store_true", help="Full-page (instead of viewport) error screenshots")
     args = ap.parse_args()
 
     state_path = Path(args.state)
@@ -1619,8 +2703,10 @@ def main():
     os.environ.setdefault("HPE_OUTDIR", str(outdir))
 
     # Configure global runtime deadline (optional)
-    global _DEADLINE
-    _DEADLINE = (time.time() + args.timeout) if getattr(args, 'timeout', 0) and args.timeout > 0 else None
+    global _DEADLINE, _RUN_GENERATED_AT, _DEEP_DEBUG
+    _RUN_GENERATED_AT = utc_now_iso()
+    _DEEP_DEBUG = bool(getattr(args, "deep_debug", False))
+    _DEADLINE = (time.monotonic() + args.timeout) if getattr(args, 'timeout', 0) and args.timeout > 0 else None
 
     if not state_path.exists():
         print(f"WARN: Missing state file: {state_path} (will attempt auto-login if HPE_USERNAME/HPE_PASSWORD set)")
@@ -1644,10 +2730,20 @@ def main():
 
 
     results, errors = [], []
+    csv_file = csv_writer = None
+    json_file = None
+    errors_file = None
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=args.headless)
-        context = browser.new_context(storage_state=str(state_path)) if state_path.exists() else browser.new_context()
+        context = get_or_create_context(browser, state_path)
+
+        # Optional warm-run speedup: HPE_ASSET_CACHE=<dir> replays static SPA
+        # assets from disk instead of refetching them every scheduled run.
+        asset_cache = (os.environ.get("HPE_ASSET_CACHE") or "").strip()
+        if asset_cache:
+            _install_asset_cache(context, Path(asset_cache))
+
         page = context.new_page()
 
         # Headless runs (Scheduled Task) sometimes render a narrower UI; use a wider viewport
@@ -1674,6 +2770,7 @@ def main():
                     _check_deadline()
                     # Login flows may open a new tab/page; ensure we keep using the active page.
                     page = ensure_page_alive(page, context)
+                    rearm_banner_flags(page)
                     dismiss_contract_banner(page, cfg)
                     dismiss_cookie_banner(page, cfg)
                     if not ok:
@@ -1682,8 +2779,8 @@ def main():
                         return 2
                     # Save state as soon as we have a valid session (prevents later SESSION_EXPIRED loops)
                     try:
-                        atomic_write_storage_state(context, state_path)
-                        print(f"Session state refreshed: {state_path}")
+                        if maybe_write_storage_state(context, state_path):
+                            print(f"Session state refreshed: {state_path}")
                     except Exception as e:
                         print(f"WARN: could not write state file ({state_path}): {e}")
                     try:
@@ -1720,6 +2817,7 @@ def main():
                         ok = recover_session(page, context, cfg, home_url, username, password)
                         _check_deadline()
                         page = ensure_page_alive(page, context)
+                        rearm_banner_flags(page)
                         dismiss_contract_banner(page, cfg)
                         dismiss_cookie_banner(page, cfg)
                         if not ok:
@@ -1727,8 +2825,8 @@ def main():
                             print("SESSION_EXPIRED (auto-relogin failed; alarm written)")
                             return 2
                         try:
-                            atomic_write_storage_state(context, state_path)
-                            print(f"Session state refreshed: {state_path}")
+                            if maybe_write_storage_state(context, state_path):
+                                print(f"Session state refreshed: {state_path}")
                         except Exception as ex:
                             print(f"WARN: could not write state file ({state_path}): {ex}")
 
@@ -1749,188 +2847,117 @@ def main():
             case_nos = [c for c in case_nos if c]
             print(f"Found cases: {len(case_nos)} -> " + ", ".join(case_nos[:20]) + (" ..." if len(case_nos) > 20 else ""))
 
-            for idx, case_no in enumerate(case_nos, start=1):
-                print(f"\n=== [{idx}/{len(case_nos)}] Case {case_no} ===")
-                _check_deadline()
-                try:
-                    open_case_by_number(page, cfg, case_no)
-
-                    click_tab(page, cfg, "tab_details_any")
-                    page.wait_for_timeout(500)
-                    details_text = redact_sensitive(extract_details_text(page))
-                    fields = parse_line_pairs(details_text)
-                    serial = fields.get("serial", "") or ""
-
-                    click_tab(page, cfg, "tab_communications_any")
-                    page.wait_for_timeout(700)
-                    click_expand_all_comms(page, cfg)
-                    page.wait_for_timeout(900)
-                    comms_text = redact_sensitive(extract_comms_text(page, cfg))
-                    # Fallback: if Overview/Details fields are missing, parse from Communications header
-                    fields_from_comms = parse_line_pairs(comms_text)
-                    for k, v in fields_from_comms.items():
-                        if v and not fields.get(k):
-                            fields[k] = v
-
-                    comms_file = outdir / "cases" / f"{case_no}_communications_redacted.txt"
-                    save_text(comms_file, comms_text)
-
-                    blocks = split_messages(comms_text)
-                    last = pick_last_hpe_message(blocks)
-                    last_ts, last_block = (last if last else ("", ""))
-
-                    hpe_subject = extract_subject(last_block)
-                    host = find_host_name(comms_text)
-                    contact_name = find_salutation_name(comms_text)
-                    addr = extract_address_block(comms_text)
-
-                    # Extra structured info from communications (handy for dashboards)
-                    event_ids = extract_event_ids(comms_text)
-                    problem_descs = extract_problem_descriptions(comms_text)
-                    ahs_links = extract_ahs_links(comms_text)
-                    drop_hosts, drop_logins = extract_dropbox_info(comms_text)
-
-                    category, summary, actions = infer_requested_actions(fields.get("status",""), comms_text)
-
-                    # If this looks like an onsite service case, try to enrich with a few structured fields.
-                    # This ONLY adds extra JSON keys; CSV stays unchanged (extras are ignored by the writer).
-                    onsite_info = extract_onsite_from_comms(comms_text)
-                    onsite_hint = (
-                        ("onsite" in (hpe_subject or "").lower())
-                        or ("onsite_detected" in onsite_info)
-                        or (category == "ONSITE_SERVICE")
-                    )
-
-                    # If comms parsing didn't reveal onsite signals, do a cheap UI hint check:
-                    # (Some 'In Progress' cases have an Onsite Service tab but short/empty comms rendering.)
-                    if not onsite_hint:
-                        try:
-                            if page.get_by_role("tab", name=re.compile(r"Onsite\s+Service", re.I)).count() > 0:
-                                onsite_hint = True
-                                onsite_info.setdefault("onsite_detected", "1")
-                        except Exception:
-                            pass
-
-                    if onsite_hint:
-                        try:
-                            onsite_tab_text = try_extract_onsite_tab_text(page)
-                            onsite_info.update(extract_onsite_kv(onsite_tab_text))
-                        except Exception:
-                            pass
-
-                    # If onsite fields are present, prefer ONSITE_SERVICE over generic IN_PROGRESS
-                    if category == "IN_PROGRESS" and any(
-                        onsite_info.get(k)
-                        for k in (
-                            "onsite_task_id",
-                            "onsite_task_ref",
-                            "onsite_scheduling_status",
-                            "onsite_latest_service_start",
-                            "onsite_engineer",
-                        )
-                    ):
-                        category = "ONSITE_SERVICE"
-                        summary = "HPE onsite interventie/dispatch loopt (technieker gepland/onderweg)."
-                        actions = [
-                            "Check Onsite Service tab voor planning/status (task ID, scheduling status, latest service start).",
-                            "Zorg dat toegang/site contact klopt; bereid interventie/onderdelen/remote access voor.",
-                        ]
-
-                    key_links = extract_key_links(last_block or comms_text, limit=8)
-
-                    action_plan = fields.get("action_plan", "")
-                    if not action_plan and fields.get("status"):
-                        sl = fields["status"].lower()
-                        if "complete action plan" in sl:
-                            action_plan = "Complete action plan"
-                        elif "approve case closure" in sl or "approve closure" in sl:
-                            action_plan = "Approve case closure"
-                    row = {
-                        "case_no": case_no,
-                        "serial": serial,
-                        "host_name": host,
-                        "contact_name": contact_name,
-                        "addr_street": addr.get("street",""),
-                        "addr_city": addr.get("city",""),
-                        "addr_state": addr.get("state",""),
-                        "addr_postal_code": addr.get("postal_code",""),
-                        "addr_country": addr.get("country",""),
-                        "status": fields.get("status",""),
-                        "severity": fields.get("severity",""),
-                        "product": fields.get("product",""),
-                        "product_no": fields.get("product_no",""),
-                        "group": fields.get("group",""),
-                        "action_plan": action_plan,
-                        "hpe_last_update": last_ts,
-                        "hpe_last_subject": hpe_subject,
-                        "hpe_request_category": category,
-                        "hpe_request_summary": summary,
-                        "hpe_requested_actions": " | ".join(actions),
-                        "hpe_key_links": " | ".join(key_links),
-                        "event_ids": " | ".join(event_ids),
-                        "problem_descriptions": " | ".join(problem_descs),
-                        "ahs_links": " | ".join(ahs_links),
-                        "dropbox_hosts": " | ".join(drop_hosts),
-                        "dropbox_logins": " | ".join(drop_logins),
-
-                        # Optional: onsite service enrichment (only in JSON; CSV ignores extras)
-                        "onsite_detected": onsite_info.get("onsite_detected",""),
-                        "onsite_task_ref": onsite_info.get("onsite_task_ref",""),
-                        "onsite_task_id": onsite_info.get("onsite_task_id",""),
-                        "onsite_scheduling_status": onsite_info.get("onsite_scheduling_status",""),
-                        "onsite_latest_service_start": onsite_info.get("onsite_latest_service_start",""),
-                        "onsite_engineer": onsite_info.get("onsite_engineer",""),
-
-                        "comms_file": str(comms_file),
-                        "generated_at": utc_now_iso()
-                    }
-                    results.append(row)
-
-                    print(f"OK: {case_no} | {serial} | {fields.get('status','')}")
-                except Exception as e:
-                    errors.append({"case_no": case_no, "error": str(e)})
-                    print(f"ERROR {case_no}: {e}")
-                    try:
-                        page.screenshot(path=str(outdir / "debug" / f"{case_no}_error.png"), full_page=True)
-                    except Exception:
-                        pass
-                    try:
-                        save_text(outdir / "debug" / f"{case_no}_error.html", page.content())
-                    except Exception:
-                        pass
-
+            # Stream finished rows straight to disk: bounded memory and a
+            # usable CSV even when a long run is interrupted mid-way.
+            # Rows stream to .tmp siblings; the finished files are promoted
+            # with a single fsync+rename each, so readers never see a
+            # truncated artifact and a crash leaves the .tmp for recovery.
             if args.format in ("csv", "both"):
-                csv_path = outdir / "cases_overview.csv"
-                fields_out = [
-                    "case_no","serial","host_name","contact_name",
-                    "addr_street","addr_city","addr_state","addr_postal_code","addr_country",
-                    "status","severity","product","product_no","group","action_plan",
-                    "hpe_last_update","hpe_last_subject","hpe_request_category","hpe_request_summary",
-                    "hpe_requested_actions","hpe_key_links",
-                    "event_ids","problem_descriptions","ahs_links","dropbox_hosts","dropbox_logins",
-                    "comms_file","generated_at"
-                ]
-                with csv_path.open("w", encoding="utf-8", newline="") as f:
-                    w = csv.DictWriter(f, fieldnames=fields_out, extrasaction="ignore")
-                    w.writeheader()
-                    for r in results:
-                        w.writerow(r)
-                print(f"\nCSV: {csv_path}")
-
+                csv_file = (outdir / "cases_overview.csv.tmp").open("w", encoding="utf-8", newline="")
+                # Plain csv.writer over a FIELDS_OUT projection: skips
+                # DictWriter's per-field fieldname walk and extras check.
+                csv_writer = csv.writer(csv_file)
+                csv_writer.writerow(FIELDS_OUT)
+
+            # JSON gets the same treatment with manual array framing; each row
+            # lands on its own line, so a crashed run leaves recoverable data.
             if args.format in ("json", "both"):
-                json_path = outdir / "cases_overview.json"
-                save_json(json_path, {"generated_at": utc_now_iso(), "cases": results, "errors": errors})
-                print(f"JSON: {json_path}")
+                json_file = (outdir / "cases_overview.json.tmp").open("w", encoding="utf-8")
+                json_file.write('{"generated_at": %s, "cases": [\n'
+                                % json.dumps(_RUN_GENERATED_AT or utc_now_iso()))
+            json_first = True
+
+            # Errors additionally stream to an append-only jsonl checkpoint, so
+            # a crashed run keeps its error trail (errors.json stays as the
+            # end-of-run consolidated view).
+            debug_dir = outdir / "debug"
+            debug_dir.mkdir(parents=True, exist_ok=True)
+            errors_file = (debug_dir / "errors.jsonl").open("a", encoding="utf-8")
+
+            emit_lock = threading.Lock()
+
+            def emit_error(rec):
+                with emit_lock:
+                    if errors_file:
+                        errors_file.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                        errors_file.flush()
+
+            def emit_row(row):
+                nonlocal json_first
+                with emit_lock:
+                    if csv_writer:
+                        csv_writer.writerow([row.get(k, "") for k in FIELDS_OUT])
+                        csv_file.flush()
+                    if json_file:
+                        if not json_first:
+                            json_file.write(",\n")
+                        json_file.write(json.dumps(row, ensure_ascii=False))
+                        json_file.flush()
+                        json_first = False
+
+            if args.workers > 1 and len(case_nos) > 1:
+                run_cases_parallel(cfg, state_path, cases_url, outdir, case_nos,
+                                   results, errors, args.headless, page,
+                                   min(args.workers, len(case_nos)),
+                                   on_row=emit_row, on_error=emit_error)
+                # Keep output order stable regardless of worker finish order:
+                # rows streamed in completion order (so a crash still leaves
+                # usable data); now that the run finished, rewrite the .tmp
+                # outputs in discovery order before they are promoted.
+                order = {cn: i for i, cn in enumerate(case_nos)}
+                results.sort(key=lambda r: order.get(r.get("case_no"), len(order)))
+                if csv_writer and results:
+                    csv_file.seek(0)
+                    csv_file.truncate()
+                    csv_writer.writerow(FIELDS_OUT)
+                    for r in results:
+                        csv_writer.writerow([r.get(k, "") for k in FIELDS_OUT])
+                if json_file and results:
+                    json_file.seek(0)
+                    json_file.truncate()
+                    json_file.write('{"generated_at": %s, "cases": [\n'
+                                    % json.dumps(_RUN_GENERATED_AT or utc_now_iso()))
+                    json_file.write(",\n".join(json.dumps(r, ensure_ascii=False) for r in results))
+            else:
+                for idx, case_no in enumerate(case_nos, start=1):
+                    print(f"\n=== [{idx}/{len(case_nos)}] Case {case_no} ===")
+                    _check_deadline()
+                    try:
+                        row = process_case(page, cfg, outdir, case_no)
+                        results.append(row)
+                        emit_row(row)
+                        print(f"OK: {case_no} | {row['serial']} | {row['status']}")
+                    except Exception as e:
+                        rec = {"case_no": case_no, "error": str(e)}
+                        errors.append(rec)
+                        emit_error(rec)
+                        print(f"ERROR {case_no}: {e}")
+                        dump_case_debug(page, outdir, case_no)
+
+            if csv_writer:
+                _finalize_output(csv_file, outdir / "cases_overview.csv.tmp",
+                                 outdir / "cases_overview.csv")
+                csv_file = csv_writer = None
+                print(f"\nCSV: {outdir / 'cases_overview.csv'}")
+
+            if json_file:
+                json_file.write('\n], "errors": ' + json.dumps(errors, ensure_ascii=False) + "}\n")
+                _finalize_output(json_file, outdir / "cases_overview.json.tmp",
+                                 outdir / "cases_overview.json")
+                json_file = None
+                print(f"JSON: {outdir / 'cases_overview.json'}")
+
+            _fsync_dir(outdir)
 
             # Refresh session state on disk to avoid daily re-login.
             try:
-                atomic_write_storage_state(context, state_path)
+                maybe_write_storage_state(context, state_path, force=True)
                 print(f"Session state refreshed: {state_path}")
             except Exception as e:
                 print(f"WARN: could not refresh state file ({state_path}): {e}")
 
             if errors:
-                save_json(outdir / "debug" / "errors.json", errors)
+                save_json(debug_dir / "errors.json", errors)
                 print(f"Completed with {len(errors)} error(s). Debug in: {outdir / 'debug'}")
                 return 1
 
@@ -1945,7 +2972,7 @@ def main():
             if str(e) == 'GLOBAL_TIMEOUT':
                 print('ERROR: GLOBAL_TIMEOUT reached. Aborting run.')
                 try:
-                    page.screenshot(path=str(outdir / 'debug' / 'global_timeout.png'), full_page=True)
+                    page.screenshot(path=str(outdir / 'debug' / 'global_timeout.png'), full_page=_DEEP_DEBUG)
                 except Exception:
                     pass
                 try:
@@ -1957,13 +2984,33 @@ def main():
 
         finally:
             try:
-                context.close()
+                if csv_file:
+                    csv_file.close()
+            except Exception:
+                pass
+            try:
+                if json_file:
+                    json_file.close()
+            except Exception:
+                pass
+            try:
+                if errors_file:
+                    errors_file.close()
+            except Exception:
+                pass
+            try:
+                release_context(context)
             except Exception:
                 pass
             try:
                 browser.close()
             except Exception:
                 pass
+            # Let pending debug writes hit the disk before the process exits.
+            try:
+                _DEBUG_POOL.shutdown(wait=True)
+            except Exception:
+                pass
 
 if __name__ == "__main__":
     raise SystemExit(main())